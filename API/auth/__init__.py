@@ -1,9 +1,9 @@
-from API.auth.password import hash_password, verify_password
+from API.auth.password import hash_password, verify_password, hash_password_async, verify_password_async
 from API.auth.jwt_handler import create_access_token, create_refresh_token, verify_token
 from API.auth.dependencies import get_current_user
 
 __all__ = [
-    "hash_password", "verify_password",
+    "hash_password", "verify_password", "hash_password_async", "verify_password_async",
     "create_access_token", "create_refresh_token", "verify_token",
     "get_current_user"
 ]
@@ -1,14 +1,91 @@
-from typing import Set
+import heapq
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, List, Tuple
 
-# In-Memory Blacklist (fr Production: Redis verwenden)
-blacklisted_tokens: Set[str] = set()
+from API.config import settings
 
 
-def add_to_blacklist(token: str):
-    """Add a token to the blacklist."""
-    blacklisted_tokens.add(token)
+class MemoryRevocationStore:
+    """Revoked token ids of this process, dropped once the token has expired."""
+    
+    def __init__(self):
+        self._expires: Dict[str, float] = {}
+        self._expiry_heap: List[Tuple[float, str]] = []
+        self._lock = threading.Lock()
+    
+    def add(self, jti: str, exp: float):
+        with self._lock:
+            self._purge(time.time())
+            self._expires[jti] = exp
+            heapq.heappush(self._expiry_heap, (exp, jti))
+    
+    def contains(self, jti: str) -> bool:
+        now = time.time()
+        with self._lock:
+            self._purge(now)
+            exp = self._expires.get(jti)
+        return exp is not None and exp > now
+    
+    def _purge(self, now: float):
+        while self._expiry_heap and self._expiry_heap[0][0] <= now:
+            exp, jti = heapq.heappop(self._expiry_heap)
+            if self._expires.get(jti) == exp:
+                del self._expires[jti]
 
 
-def is_blacklisted(token: str) -> bool:
-    """Check if a token is blacklisted."""
-    return token in blacklisted_tokens
+class SQLiteRevocationStore:
+    """Revoked token ids in a SQLite file shared by all workers on one host."""
+    
+    def __init__(self, path: str):
+        self.path = path
+        self._connection = None
+        self._pid = None
+        self._lock = threading.Lock()
+    
+    def _connect(self) -> sqlite3.Connection:
+        # Opened on first use, connections must not be shared with forked worker processes
+        if self._connection is None or self._pid != os.getpid():
+            connection = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None, timeout=5)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("CREATE TABLE IF NOT EXISTS revoked_tokens (jti TEXT PRIMARY KEY, exp REAL NOT NULL)")
+            connection.execute("CREATE INDEX IF NOT EXISTS ix_revoked_tokens_exp ON revoked_tokens (exp)")
+            self._connection = connection
+            self._pid = os.getpid()
+        return self._connection
+    
+    def add(self, jti: str, exp: float):
+        with self._lock:
+            connection = self._connect()
+            connection.execute("DELETE FROM revoked_tokens WHERE exp <= ?", (time.time(),))
+            connection.execute("INSERT OR REPLACE INTO revoked_tokens (jti, exp) VALUES (?, ?)", (jti, exp))
+    
+    def contains(self, jti: str) -> bool:
+        with self._lock:
+            row = self._connect().execute(
+                "SELECT 1 FROM revoked_tokens WHERE jti = ? AND exp > ?",
+                (jti, time.time())
+            ).fetchone()
+        return row is not None
+
+
+def create_revocation_store():
+    """Create the revocation store configured by token_revocation_backend."""
+    if settings.token_revocation_backend == "sqlite":
+        return SQLiteRevocationStore(settings.token_revocation_path)
+    return MemoryRevocationStore()
+
+
+revocation_store = create_revocation_store()
+
+
+def add_to_blacklist(jti: str, exp: float):
+    """Revoke a token by its id until it expires."""
+    revocation_store.add(jti, exp)
+
+
+def is_blacklisted(jti: str) -> bool:
+    """Check if a token id has been revoked."""
+    return revocation_store.contains(jti)
@@ -1,43 +1,84 @@
-from fastapi import Depends, HTTPException, status
+from fastapi import Depends, HTTPException, Request, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from sqlalchemy.orm import Session
 
-from API.database import get_db
-from API.auth.jwt_handler import verify_token
+from API.database import get_db, get_async_db, async_variant
+from API.auth.jwt_handler import get_request_claims
 from API.auth.blacklist import is_blacklisted
 from API.models.user import User
+from API.auth.user_cache import AuthenticatedUser, user_cache
 
 security = HTTPBearer()
 
 
-def get_current_user(
-    credentials: HTTPAuthorizationCredentials = Depends(security),
-    db: Session = Depends(get_db)
-) -> User:
-    """Get current authenticated user."""
-    token = credentials.credentials
+def get_token_user_id(request: Request) -> int:
+    """Validate the request's access token and return its user id.
     
-    # Check if token is blacklisted
-    if is_blacklisted(token):
+    The token is verified once per request, the rate limiter may have done it already.
+    """
+    payload = get_request_claims(request)
+    
+    if payload is None:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Token has been revoked"
+            detail="Invalid or expired token"
         )
     
-    user_id = verify_token(token, "access")
-    
-    if user_id is None:
+    # Check if token is blacklisted
+    if "jti" in payload and is_blacklisted(payload["jti"]):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Invalid or expired token"
+            detail="Token has been revoked"
         )
     
-    user = db.query(User).filter(User.id == user_id).first()
-    
+    return int(payload["sub"])
+
+
+def cache_user(user) -> AuthenticatedUser:
+    """Reject tokens of users that no longer exist and cache the others."""
     if user is None:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="User not found"
         )
     
-    return user
+    return user_cache.put(user)
+
+
+def get_current_user_sync(
+    request: Request,
+    credentials: HTTPAuthorizationCredentials = Depends(security),
+    db: Session = Depends(get_db)
+) -> AuthenticatedUser:
+    """Get current authenticated user."""
+    user_id = get_token_user_id(request)
+    
+    cached = user_cache.get(user_id)
+    if cached is not None:
+        return cached
+    
+    user = db.query(User).filter(User.id == user_id).first()
+    
+    return cache_user(user)
+
+
+@async_variant(get_current_user_sync)
+async def get_current_user_async(
+    request: Request,
+    credentials: HTTPAuthorizationCredentials = Depends(security),
+    db=Depends(get_async_db)
+) -> AuthenticatedUser:
+    """Get current authenticated user on the async engine."""
+    user_id = get_token_user_id(request)
+    
+    cached = user_cache.get(user_id)
+    if cached is not None:
+        return cached
+    
+    user = await db.get(User, user_id)
+    
+    return cache_user(user)
+
+
+# Async endpoints on a DatabaseRoute get get_current_user_async when async_database is on
+get_current_user = get_current_user_sync
@@ -1,8 +1,17 @@
+import hashlib
+import time
+import uuid
 from datetime import datetime, timedelta
 from typing import Optional
+from fastapi import Request
+from fastapi.security.utils import get_authorization_scheme_param
 from jose import JWTError, jwt
 
 from API.config import settings
+from API.services.cache import TimedLRU
+
+# Claims of verified tokens by token digest, every entry expires with its token
+verified_tokens = TimedLRU(settings.verified_token_cache_size, 0)
 
 
 def create_access_token(user_id: int) -> str:
@@ -11,7 +20,8 @@ def create_access_token(user_id: int) -> str:
     payload = {
         "sub": str(user_id),
         "exp": expire,
-        "type": "access"
+        "type": "access",
+        "jti": uuid.uuid4().hex
     }
     return jwt.encode(payload, settings.jwt_secret_key, algorithm=settings.jwt_algorithm)
 
@@ -22,23 +32,61 @@ def create_refresh_token(user_id: int) -> str:
     payload = {
         "sub": str(user_id),
         "exp": expire,
-        "type": "refresh"
+        "type": "refresh",
+        "jti": uuid.uuid4().hex
     }
     return jwt.encode(payload, settings.jwt_secret_key, algorithm=settings.jwt_algorithm)
 
 
-def verify_token(token: str, token_type: str = "access") -> Optional[int]:
-    """Verify a token and return user_id if valid."""
-    try:
-        payload = jwt.decode(token, settings.jwt_secret_key, algorithms=[settings.jwt_algorithm])
-        
-        if payload.get("type") != token_type:
+def decode_token(token: str, token_type: str = "access") -> Optional[dict]:
+    """Verify a token and return its claims if valid.
+    
+    A token verified before is answered from verified_tokens until it expires.
+    """
+    digest = hashlib.sha256(token.encode()).digest()
+    payload = verified_tokens.get(digest)
+    
+    if payload is None:
+        try:
+            payload = jwt.decode(token, settings.jwt_secret_key, algorithms=[settings.jwt_algorithm])
+        except JWTError:
             return None
         
-        user_id = payload.get("sub")
-        if user_id is None:
-            return None
-        
-        return int(user_id)
-    except JWTError:
+        if "exp" in payload:
+            verified_tokens.put(digest, payload, ttl_seconds=payload["exp"] - time.time())
+    
+    if payload.get("type") != token_type:
+        return None
+    
+    if payload.get("sub") is None:
+        return None
+    
+    return payload
+
+
+def get_request_claims(request: Request) -> Optional[dict]:
+    """Get the claims of the request's access token, verified once per request.
+    
+    Shared through request.state by the rate limiter and the auth dependency.
+    Returns None without a valid bearer token.
+    """
+    if hasattr(request.state, "token_claims"):
+        return request.state.token_claims
+    
+    claims = None
+    scheme, token = get_authorization_scheme_param(request.headers.get("Authorization"))
+    if scheme.lower() == "bearer" and token:
+        claims = decode_token(token, "access")
+    
+    request.state.token_claims = claims
+    return claims
+
+
+def verify_token(token: str, token_type: str = "access") -> Optional[int]:
+    """Verify a token and return user_id if valid."""
+    payload = decode_token(token, token_type)
+    
+    if payload is None:
         return None
+    
+    return int(payload["sub"])
@@ -1,7 +1,18 @@
+import asyncio
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from fastapi import HTTPException, status
 from passlib.context import CryptContext
 
+from API.config import settings
+
 password_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
+# bcrypt runs in worker processes, at most workers + queue calls are in flight
+hash_executor = None
+hash_slots = threading.BoundedSemaphore(settings.password_hash_workers + settings.password_hash_queue)
+
 
 def hash_password(password: str) -> str:
     """Hash a password using bcrypt."""
@@ -11,3 +22,56 @@ def hash_password(password: str) -> str:
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     """Verify a password against a hash."""
     return password_context.verify(plain_password, hashed_password)
+
+
+def start_hash_executor():
+    """Start the bcrypt worker processes, call on startup.
+
+    Workers are started by a fork server (spawn where there is none) instead
+    of forking the server process with its threads, locks and connections.
+    """
+    global hash_executor
+    if hash_executor is None:
+        method = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+        hash_executor = ProcessPoolExecutor(
+            max_workers=settings.password_hash_workers,
+            mp_context=multiprocessing.get_context(method)
+        )
+
+
+def get_hash_executor() -> ProcessPoolExecutor:
+    start_hash_executor()
+    return hash_executor
+
+
+def shutdown_hash_executor():
+    """Stop the bcrypt worker processes."""
+    global hash_executor
+    if hash_executor is not None:
+        hash_executor.shutdown(wait=False, cancel_futures=True)
+        hash_executor = None
+
+
+async def run_in_hash_pool(func, *args):
+    """Run a bcrypt call in the process pool, rejecting with 503 when it is full."""
+    if not hash_slots.acquire(blocking=False):
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Server busy, please try again",
+            headers={"Retry-After": "1"}
+        )
+    try:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(get_hash_executor(), func, *args)
+    finally:
+        hash_slots.release()
+
+
+async def hash_password_async(password: str) -> str:
+    """Hash a password without blocking the event loop."""
+    return await run_in_hash_pool(hash_password, password)
+
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    """Verify a password without blocking the event loop."""
+    return await run_in_hash_pool(verify_password, plain_password, hashed_password)
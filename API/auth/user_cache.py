@@ -0,0 +1,65 @@
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+from typing import Optional
+
+from API.config import settings
+from API.models.user import User
+from API.services.cache import TimedLRU
+
+
+class AuthenticatedUser:
+    """Detached identity of the current user, safe to share between requests.
+    
+    Routes that modify the user load the User row themselves.
+    """
+    __slots__ = ("id", "username", "displayName")
+    
+    def __init__(self, id: int, username: str, displayName: str):
+        self.id = id
+        self.username = username
+        self.displayName = displayName
+
+
+class UserCache:
+    """LRU cache of authenticated users with a time to live."""
+    
+    def __init__(self, max_size: int, ttl_seconds: float):
+        self._entries = TimedLRU(max_size, ttl_seconds)
+    
+    def get(self, user_id: int) -> Optional[AuthenticatedUser]:
+        return self._entries.get(user_id)
+    
+    def put(self, user: User) -> AuthenticatedUser:
+        """Cache a detached copy of a user and return it."""
+        authenticated = AuthenticatedUser(user.id, user.username, user.displayName)
+        self._entries.put(user.id, authenticated)
+        return authenticated
+    
+    def invalidate(self, user_id: int):
+        self._entries.pop(user_id)
+    
+    def clear(self):
+        self._entries.clear()
+
+
+user_cache = UserCache(settings.user_cache_size, settings.user_cache_ttl_seconds)
+
+
+@event.listens_for(Session, "after_flush")
+def collect_users(session: Session, flush_context):
+    """Remember updated and deleted users until the transaction ends."""
+    for obj in list(session.dirty) + list(session.deleted):
+        if isinstance(obj, User):
+            session.info.setdefault("users", set()).add(obj.id)
+
+
+@event.listens_for(Session, "after_commit")
+def invalidate_users(session: Session):
+    """Drop committed users from this worker's cache, other workers reload them after the TTL."""
+    for user_id in session.info.pop("users", ()):
+        user_cache.invalidate(user_id)
+
+
+@event.listens_for(Session, "after_rollback")
+def discard_users(session: Session):
+    session.info.pop("users", None)
@@ -0,0 +1,238 @@
+import gzip
+import zlib
+from typing import List, Optional
+
+import brotli
+from fastapi import Request, Response
+from starlette.concurrency import run_in_threadpool
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from API.config import settings
+from API.services.cache import TimedLRU
+
+# Preferred first when the client accepts both with the same quality
+ENCODINGS = ("br", "gzip")
+
+# Streams that must reach the client event by event
+UNBUFFERED_MEDIA_TYPES = ("text/event-stream",)
+
+# Compressed bodies by (ETag of the uncompressed body, encoding), a strong ETag always has the same body
+compressed_cache = TimedLRU(settings.compression_cache_size, settings.compression_cache_ttl_seconds)
+
+
+def negotiate_encoding(accept_encoding: str) -> Optional[str]:
+    """Pick the best supported encoding from an Accept-Encoding header."""
+    qualities = {}
+    for coding in accept_encoding.split(","):
+        name, *params = [part.strip() for part in coding.split(";")]
+        quality = 1.0
+        for param in params:
+            if param.startswith("q="):
+                try:
+                    quality = float(param[2:])
+                except ValueError:
+                    quality = 0.0
+        qualities[name.lower()] = quality
+
+    best = None
+    best_quality = 0.0
+    for encoding in ENCODINGS:
+        quality = qualities.get(encoding, qualities.get("*", 0.0))
+        if quality > best_quality:
+            best, best_quality = encoding, quality
+    return best
+
+
+def encoded_etag(etag: str, encoding: str) -> str:
+    """ETag of a compressed body, e.g. "abc" -> "abc-br".
+
+    Every encoding is a different body and needs its own strong ETag.
+    """
+    if not etag.endswith('"'):
+        return etag
+    return f'{etag[:-1]}-{encoding}"'
+
+
+def etag_variants(etag: str) -> List[str]:
+    """The ETag and the ETags of its compressed bodies."""
+    return [etag] + [encoded_etag(etag, encoding) for encoding in ENCODINGS]
+
+
+def vary_on_encoding(headers: MutableHeaders):
+    """Add Accept-Encoding to the Vary header once."""
+    if "accept-encoding" not in headers.get("vary", "").lower():
+        headers.add_vary_header("Accept-Encoding")
+
+
+def compress(body: bytes, encoding: str) -> bytes:
+    """Compress a complete body."""
+    if encoding == "br":
+        return brotli.compress(body, quality=settings.brotli_quality)
+    return gzip.compress(body, compresslevel=settings.gzip_level, mtime=0)
+
+
+class StreamCompressor:
+    """Compress a body chunk by chunk."""
+
+    def __init__(self, encoding: str):
+        self.encoding = encoding
+        if encoding == "br":
+            self._compressor = brotli.Compressor(quality=settings.brotli_quality)
+        else:
+            self._compressor = zlib.compressobj(settings.gzip_level, zlib.DEFLATED, zlib.MAX_WBITS | 16)
+
+    def compress(self, chunk: bytes) -> bytes:
+        if self.encoding == "br":
+            return self._compressor.process(chunk) + self._compressor.flush()
+        return self._compressor.compress(chunk) + self._compressor.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self) -> bytes:
+        if self.encoding == "br":
+            return self._compressor.finish()
+        return self._compressor.flush()
+
+
+def cached_compressed_response(request: Request, etag: str, headers: dict) -> Optional[Response]:
+    """Get the response for an ETag from the compressed cache, if the client accepts its encoding."""
+    encoding = negotiate_encoding(request.headers.get("Accept-Encoding", ""))
+    if encoding is None:
+        return None
+
+    cached = compressed_cache.get((etag, encoding))
+    if cached is None:
+        return None
+
+    media_type, body = cached
+    response = Response(content=body, media_type=media_type, headers=headers)
+    response.headers["Content-Encoding"] = encoding
+    response.headers["ETag"] = encoded_etag(etag, encoding)
+    vary_on_encoding(response.headers)
+    return response
+
+
+class CompressionMiddleware:
+    """Compress responses with gzip or brotli, depending on Accept-Encoding.
+
+    Bodies smaller than minimum_size are sent as is. Compression runs in the
+    threadpool so large snapshots do not block the event loop. Compressed
+    responses with an ETag are kept in compressed_cache.
+    """
+
+    def __init__(self, app: ASGIApp, minimum_size: int = 1024):
+        self.app = app
+        self.minimum_size = minimum_size
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        encoding = negotiate_encoding(Headers(scope=scope).get("Accept-Encoding", ""))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        responder = CompressionResponder(self.app, encoding, self.minimum_size)
+        await responder(scope, receive, send)
+
+
+class CompressionResponder:
+    """Compress the response of one request.
+
+    Responses with a Content-Length are collected and compressed as a whole,
+    even when an inner middleware sends them in several parts. Responses
+    without one are streams and are compressed chunk by chunk.
+    """
+
+    def __init__(self, app: ASGIApp, encoding: str, minimum_size: int):
+        self.app = app
+        self.encoding = encoding
+        self.minimum_size = minimum_size
+        self.send = None
+        self.start_message = None
+        self.passthrough = False
+        self.buffered = False
+        self.body = []
+        self.compressor = None
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        self.send = send
+        await self.app(scope, receive, self.send_compressed)
+
+    async def send_compressed(self, message: Message):
+        if message["type"] == "http.response.start":
+            self.start_message = message
+            headers = Headers(raw=message["headers"])
+            content_length = headers.get("content-length")
+            self.buffered = content_length is not None
+            self.passthrough = (
+                "content-encoding" in headers
+                or headers.get("content-type", "").startswith(UNBUFFERED_MEDIA_TYPES)
+                or (self.buffered and int(content_length) < self.minimum_size)
+            )
+            return
+
+        if message["type"] != "http.response.body":
+            await self.send(message)
+            return
+
+        body = message.get("body", b"")
+        more_body = message.get("more_body", False)
+
+        if self.passthrough:
+            await self.send_start()
+            await self.send(message)
+            return
+
+        if self.buffered:
+            self.body.append(body)
+            if more_body:
+                return
+            await self.send_complete(b"".join(self.body))
+            return
+
+        if self.start_message is not None:
+            if not more_body:
+                await self.send_complete(body)
+                return
+            headers = self.encoded_headers()
+            del headers["Content-Length"]
+            self.compressor = StreamCompressor(self.encoding)
+            await self.send_start()
+
+        chunk = await run_in_threadpool(self.compressor.compress, body) if body else b""
+        if not more_body:
+            chunk += self.compressor.finish()
+        await self.send({"type": "http.response.body", "body": chunk, "more_body": more_body})
+
+    async def send_start(self):
+        if self.start_message is not None:
+            await self.send(self.start_message)
+            self.start_message = None
+
+    def encoded_headers(self) -> MutableHeaders:
+        headers = MutableHeaders(raw=self.start_message["headers"])
+        headers["Content-Encoding"] = self.encoding
+        if "etag" in headers:
+            headers["ETag"] = encoded_etag(headers["etag"], self.encoding)
+        vary_on_encoding(headers)
+        return headers
+
+    async def send_complete(self, body: bytes):
+        """Send a complete body, compressed if it is large enough."""
+        if len(body) < self.minimum_size:
+            await self.send_start()
+            await self.send({"type": "http.response.body", "body": body})
+            return
+
+        compressed = await run_in_threadpool(compress, body, self.encoding)
+        etag = Headers(raw=self.start_message["headers"]).get("etag")
+        headers = self.encoded_headers()
+        headers["Content-Length"] = str(len(compressed))
+
+        if etag and self.start_message["status"] == 200:
+            compressed_cache.put((etag, self.encoding), (headers.get("content-type"), compressed))
+
+        await self.send_start()
+        await self.send({"type": "http.response.body", "body": compressed})
@@ -1,4 +1,5 @@
 from pydantic_settings import BaseSettings
+from typing import Literal, Optional
 
 
 class Settings(BaseSettings):
@@ -6,10 +7,77 @@ class Settings(BaseSettings):
     debug: bool = True
     
     database_url: str
+    # Run async database endpoints on an async engine (aiomysql / aiosqlite), sync ones stay in the threadpool
+    async_database: bool = False
+    async_database_url: Optional[str] = None
     jwt_secret_key: str
     jwt_algorithm: str = "HS256"
     access_token_expire_minutes: int = 15
     refresh_token_expire_days: int = 7
+    # Verified tokens kept until they expire, so repeated requests skip the JWT decode
+    verified_token_cache_size: int = 10000
+    
+    # bcrypt process pool, calls beyond workers + queue are rejected with 503
+    password_hash_workers: int = 2
+    password_hash_queue: int = 8
+    
+    # Revoked tokens: "memory" (per process) or "sqlite" (shared by all workers)
+    token_revocation_backend: Literal["memory", "sqlite"] = "memory"
+    token_revocation_path: str = "revoked_tokens.sqlite3"
+    
+    # Turn off for load tests, all virtual users come from one address
+    rate_limit_enabled: bool = True
+    # Rate limit buckets: "memory" (per process) or "sqlite" (shared by all workers)
+    rate_limit_backend: Literal["memory", "sqlite"] = "memory"
+    rate_limit_path: str = "rate_limits.sqlite3"
+    
+    # Authenticated users cached per worker, changes from other workers show up after the TTL
+    user_cache_size: int = 10000
+    user_cache_ttl_seconds: int = 60
+    
+    # Number of groups kept in the snapshot fragment cache
+    snapshot_cache_size: int = 1024
+    
+    # Change stream (/events)
+    events_heartbeat_seconds: int = 15
+    events_queue_size: int = 100
+    events_replay_limit: int = 500
+    
+    # Change log ids are allocated on insert but visible on commit, cursors stay behind
+    # changes younger than this so a slower concurrent transaction is not skipped
+    change_cursor_safety_seconds: int = 10
+    # Older changes are deleted, clients with an older cursor get a full snapshot
+    change_retention_days: int = 30
+    change_prune_interval_seconds: int = 3600
+    
+    # orjson default responses and validation-free encoding of list endpoints
+    fast_json: bool = False
+    
+    # Response compression (brotli / gzip), smaller bodies are sent as is
+    compression_minimum_size: int = 1024
+    gzip_level: int = 6
+    brotli_quality: int = 4
+    # Compressed snapshot bodies kept by ETag
+    compression_cache_size: int = 256
+    compression_cache_ttl_seconds: int = 600
+    
+    # Log file shared by all workers, rotate it with logrotate. With log_max_bytes > 0 every
+    # worker writes and rotates its own api.<pid>.log instead
+    log_file: str = "api.log"
+    log_max_bytes: int = 0
+    log_backup_count: int = 5
+    # Access log of 1 in N successful snapshot polls, 0 logs none
+    snapshot_access_log_sample: int = 100
+    
+    # Request metrics on /metrics (Prometheus text format), per worker. Scrapers send
+    # Authorization: Bearer <metrics_token>, without a token /metrics is not served
+    metrics_enabled: bool = True
+    metrics_token: Optional[str] = None
+    
+    # Statement count and DB time per request in the X-SQL-Profile header and the log, for debugging
+    sql_profiler: bool = False
+    # Statements run this often with the same shape in one request are logged as likely N+1
+    sql_profiler_repeat_threshold: int = 3
     
     class Config:
         env_file = ".env"
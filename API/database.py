@@ -1,6 +1,12 @@
+import functools
+import inspect
+from fastapi import Depends, params
+from fastapi.routing import APIRoute
 from sqlalchemy import create_engine
+from sqlalchemy.engine import make_url
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.orm import Session, sessionmaker
+from starlette.concurrency import run_in_threadpool
 
 from API.config import settings
 
@@ -10,6 +16,34 @@ SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
 Base = declarative_base()
 
+# Async drivers used for the sync drivers in DATABASE_URL
+ASYNC_DRIVERS = {
+    "mysql": "aiomysql",
+    "mariadb": "aiomysql",
+    "sqlite": "aiosqlite",
+}
+
+
+def get_async_database_url() -> str:
+    """Get the async database url, derived from DATABASE_URL if not configured."""
+    if settings.async_database_url:
+        return settings.async_database_url
+
+    url = make_url(settings.database_url)
+    return url.set(drivername=f"{url.get_backend_name()}+{ASYNC_DRIVERS[url.get_backend_name()]}").render_as_string(
+        hide_password=False
+    )
+
+
+if settings.async_database:
+    from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+
+    async_engine = create_async_engine(get_async_database_url())
+    AsyncSessionLocal = async_sessionmaker(async_engine, autocommit=False, autoflush=False)
+else:
+    async_engine = None
+    AsyncSessionLocal = None
+
 
 def get_db():
     """Dependency for database session."""
@@ -18,3 +52,70 @@ def get_db():
         yield db
     finally:
         db.close()
+
+
+async def get_async_db():
+    """Dependency for async database session."""
+    async with AsyncSessionLocal() as db:
+        yield db
+
+
+# Async variants swapped in for dependencies of async endpoints, see run_with_async_session
+async_dependencies = {}
+
+
+def async_variant(dependency):
+    """Register the decorated function as the async variant of a sync dependency."""
+    def register(variant):
+        async_dependencies[dependency] = variant
+        return variant
+    return register
+
+
+async def run_db(db, func, *args):
+    """Run sync session code from an async endpoint without blocking the event loop.
+
+    Works with the sync session (threadpool) and the async session (run_sync).
+    """
+    if isinstance(db, Session):
+        return await run_in_threadpool(func, db, *args)
+    return await db.run_sync(func, *args)
+
+
+def async_parameter(name: str, param: inspect.Parameter) -> inspect.Parameter:
+    """Swap the session or a dependency with a registered async variant."""
+    if name == "db":
+        return param.replace(default=Depends(get_async_db))
+    if isinstance(param.default, params.Depends) and param.default.dependency in async_dependencies:
+        return param.replace(default=Depends(async_dependencies[param.default.dependency]))
+    return param
+
+
+def run_with_async_session(endpoint):
+    """Give async endpoints the async session and the async variants of their dependencies.
+
+    Their queries are awaited through run_db. Sync endpoints keep the sync
+    session and dependencies, which share one session per request and run in
+    the threadpool, their ORM work and serialization must not block the event loop.
+    """
+    if not settings.async_database or not inspect.iscoroutinefunction(endpoint):
+        return endpoint
+
+    signature = inspect.signature(endpoint)
+    parameters = [async_parameter(name, param) for name, param in signature.parameters.items()]
+    if parameters == list(signature.parameters.values()):
+        return endpoint
+
+    @functools.wraps(endpoint)
+    async def wrapper(*args, **kwargs):
+        return await endpoint(*args, **kwargs)
+
+    wrapper.__signature__ = signature.replace(parameters=parameters)
+    return wrapper
+
+
+class DatabaseRoute(APIRoute):
+    """Route class running async database endpoints on the async engine when enabled."""
+
+    def __init__(self, path: str, endpoint, **kwargs):
+        super().__init__(path, run_with_async_session(endpoint), **kwargs)
@@ -0,0 +1,84 @@
+"""Logging through a queue, files and the console are written by a background thread.
+
+Request handlers only put records on the queue. The listener thread formats
+them and writes the log file, so a slow disk never blocks a request.
+"""
+import itertools
+import logging
+import os
+import queue
+import sys
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler, WatchedFileHandler
+
+from API.config import settings
+
+log_formatter = logging.Formatter(
+    fmt="%(asctime)s | %(levelname)-8s | %(name)-15s | %(message)s",
+    datefmt="%Y-%m-%d %H:%M:%S"
+)
+
+
+class SnapshotAccessFilter(logging.Filter):
+    """Keep 1 in sample_every access log lines of successful snapshot polls.
+    
+    Uses the fields uvicorn passes as record args
+    (client, method, path, http version, status) instead of formatting the message.
+    """
+    
+    def __init__(self, sample_every: int):
+        super().__init__()
+        self.sample_every = sample_every
+        self._polls = itertools.count()
+    
+    def filter(self, record: logging.LogRecord) -> bool:
+        args = record.args
+        if not isinstance(args, tuple) or len(args) != 5:
+            return True
+        
+        _, method, path, _, status_code = args
+        if method != "GET" or not path.startswith("/snapshot") or status_code not in (200, 304):
+            return True
+        
+        if self.sample_every <= 0:
+            return False
+        return next(self._polls) % self.sample_every == 0
+
+
+def setup_logging() -> QueueListener:
+    """Route the sharedcart and uvicorn loggers through one queue.
+    
+    Returns the listener, start it before serving and stop it on shutdown
+    to flush the queue.
+    """
+    if settings.log_max_bytes > 0:
+        # Workers cannot rotate a shared file, each one rotates its own
+        root, extension = os.path.splitext(settings.log_file)
+        file_handler = RotatingFileHandler(
+            f"{root}.{os.getpid()}{extension}",
+            maxBytes=settings.log_max_bytes,
+            backupCount=settings.log_backup_count
+        )
+    else:
+        # Reopened when logrotate moves the file
+        file_handler = WatchedFileHandler(settings.log_file)
+    file_handler.setFormatter(log_formatter)
+    
+    # uvicorn prints its own lines to the console
+    console_handler = logging.StreamHandler(sys.stdout)
+    console_handler.setFormatter(log_formatter)
+    console_handler.addFilter(logging.Filter("sharedcart"))
+    
+    log_queue = queue.SimpleQueue()
+    queue_handler = QueueHandler(log_queue)
+    
+    logger = logging.getLogger("sharedcart")
+    logger.setLevel(logging.INFO)
+    logger.addHandler(queue_handler)
+    
+    for log_name in ["uvicorn.access", "uvicorn.error"]:
+        logging.getLogger(log_name).addHandler(queue_handler)
+    
+    # Filters on the logger run before the record is queued
+    logging.getLogger("uvicorn.access").addFilter(SnapshotAccessFilter(settings.snapshot_access_log_sample))
+    
+    return QueueListener(log_queue, file_handler, console_handler)
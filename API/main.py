@@ -1,58 +1,41 @@
+import asyncio
 import logging
-import sys
 from fastapi import FastAPI, Request
-from fastapi.responses import JSONResponse
-from slowapi import _rate_limit_exceeded_handler
+from fastapi.responses import JSONResponse, ORJSONResponse
+from starlette.concurrency import run_in_threadpool
 from slowapi.errors import RateLimitExceeded
 from slowapi.middleware import SlowAPIMiddleware
 
 from API.config import settings
+from API.database import engine, async_engine, SessionLocal
+from API.logging_config import setup_logging
+from API.migrations import run_migrations
 from API.rate_limiter import limiter
+from API.compression import CompressionMiddleware
+from API.sql_profiler import SQLProfilerMiddleware, profile_engines
+from API.metrics import (
+    MetricsMiddleware, instrument_pool, check_metrics_token, metrics_response, rate_limit_exceeded_handler
+)
+from API.auth.password import start_hash_executor, shutdown_hash_executor
+from API.services.changes import prune_changes
 from API.routers.auth import router as auth_router
 from API.routers.users import router as users_router
 from API.routers.groups import router as groups_router
 from API.routers.shopping_lists import router as shopping_lists_router
 from API.routers.shopping_items import router as shopping_items_router
 from API.routers.snapshot import router as snapshot_router
+from API.routers.events import router as events_router
 
-class EndpointFilter(logging.Filter):
-    def filter(self, record: logging.LogRecord) -> bool:
-        try:
-            message = record.getMessage()
-            if "GET /snapshot" in message and " 200" in message:
-                return False
-        except Exception:
-            pass
-        return True
-
-
-log_formatter = logging.Formatter(
-    fmt="%(asctime)s | %(levelname)-8s | %(name)-15s | %(message)s",
-    datefmt="%Y-%m-%d %H:%M:%S"
-)
-
-file_handler = logging.FileHandler("api.log")
-file_handler.setFormatter(log_formatter)
-
-console_handler = logging.StreamHandler(sys.stdout)
-console_handler.setFormatter(log_formatter)
-
+log_listener = setup_logging()
+log_listener.start()
 logger = logging.getLogger("sharedcart")
-logger.setLevel(logging.INFO)
-logger.addHandler(file_handler)
-logger.addHandler(console_handler)
-
-for log_name in ["uvicorn.access", "uvicorn.error"]:
-    uv_logger = logging.getLogger(log_name)
-    uv_logger.addHandler(file_handler)
-
-logging.getLogger("uvicorn.access").addFilter(EndpointFilter())
 
 
 app = FastAPI(
     title=settings.app_name,
     description="Backend API for SharedCart",
-    version="1.0.0"
+    version="1.0.0",
+    default_response_class=ORJSONResponse if settings.fast_json else JSONResponse
 )
 
 # Globaler Exception Handler
@@ -67,17 +50,29 @@ async def global_exception_handler(request: Request, exc: Exception):
 
 # Rate Limiter Setup
 app.state.limiter = limiter
-app.add_exception_handler(RateLimitExceeded, _rate_limit_exceeded_handler)
+app.add_exception_handler(RateLimitExceeded, rate_limit_exceeded_handler)
 from fastapi import FastAPI, Request
 from fastapi.responses import JSONResponse
-from slowapi import _rate_limit_exceeded_handler
 from slowapi.errors import RateLimitExceeded
 from slowapi.middleware import SlowAPIMiddleware
 
 # Rate Limiter
 app.state.limiter = limiter
-app.add_exception_handler(RateLimitExceeded, _rate_limit_exceeded_handler)
+app.add_exception_handler(RateLimitExceeded, rate_limit_exceeded_handler)
 app.add_middleware(SlowAPIMiddleware)
+app.add_middleware(CompressionMiddleware, minimum_size=settings.compression_minimum_size)
+
+# Opt-in statement counting per request, see API/sql_profiler.py
+if settings.sql_profiler:
+    app.add_middleware(SQLProfilerMiddleware, repeat_threshold=settings.sql_profiler_repeat_threshold)
+    profile_engines([engine] if async_engine is None else [engine, async_engine.sync_engine])
+
+# Request metrics, outermost so the latency includes compression
+if settings.metrics_enabled:
+    app.add_middleware(MetricsMiddleware)
+    instrument_pool(engine.pool)
+    if async_engine is not None:
+        instrument_pool(async_engine.sync_engine.pool)
 
 # Register routers
 app.include_router(auth_router)
@@ -86,15 +81,43 @@ app.include_router(groups_router)
 app.include_router(shopping_lists_router)
 app.include_router(shopping_items_router)
 app.include_router(snapshot_router)
+app.include_router(events_router)
+
+
+def prune_change_log():
+    db = SessionLocal()
+    try:
+        deleted = prune_changes(db)
+        if deleted:
+            logger.info(f"Pruned {deleted} changes older than {settings.change_retention_days} days")
+    finally:
+        db.close()
+
+
+async def prune_change_log_periodically():
+    """Delete old changes every change_prune_interval_seconds in every worker."""
+    while True:
+        try:
+            await run_in_threadpool(prune_change_log)
+        except Exception as exc:
+            logger.error(f"Pruning the change log failed: {exc}", exc_info=True)
+        await asyncio.sleep(settings.change_prune_interval_seconds)
 
 
 @app.on_event("startup")
 async def startup_event():
+    # Creates missing tables and indexes, see API/migrations
+    run_migrations()
+    start_hash_executor()
+    app.state.prune_task = asyncio.create_task(prune_change_log_periodically())
     logger.info("SharedCart API started successfully")
 
 @app.on_event("shutdown")
 async def shutdown_event():
     logger.info("SharedCart API is shutting down")
+    app.state.prune_task.cancel()
+    shutdown_hash_executor()
+    log_listener.stop()
 
 @app.get("/")
 @limiter.limit("10/minute")
@@ -104,3 +127,9 @@ def root(request: Request):
 @app.get("/health")
 def health_check():
     return {"status": "healthy"}
+
+if settings.metrics_enabled:
+    @app.get("/metrics", include_in_schema=False)
+    def metrics(request: Request):
+        check_metrics_token(request, settings.metrics_token)
+        return metrics_response()
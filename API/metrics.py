@@ -0,0 +1,232 @@
+"""Request metrics in the Prometheus text format, served on /metrics.
+
+Counters are plain ints and lists of this worker process, updated without
+locks. Requests are counted on the event loop thread. Pool checkouts are
+also recorded from threadpool threads, where an increment may rarely be
+lost, which is fine for metrics. Gauges of the pools are read from the
+pools when rendering. Each worker reports its own numbers.
+"""
+import functools
+import time
+from bisect import bisect_left
+from typing import Dict, List, Sequence, Tuple
+
+import secrets
+from fastapi import HTTPException, Request, status
+from fastapi.responses import PlainTextResponse
+from slowapi import _rate_limit_exceeded_handler
+from slowapi.errors import RateLimitExceeded
+from sqlalchemy import event
+from sqlalchemy.pool import Pool
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Seconds
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+POOL_HOLD_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 5.0)
+POOL_WAIT_BUCKETS = (0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 30.0)
+
+# Label of requests no route matched, keeps unknown paths out of the labels
+UNMATCHED_ROUTE = "unmatched"
+
+
+class Histogram:
+    """Observations counted per bucket, rendered cumulative like Prometheus."""
+
+    def __init__(self, buckets: Sequence[float]):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+
+    def observe(self, value: float):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+
+    def samples(self, name: str, labels: str):
+        """Yield the _bucket, _sum and _count lines."""
+        prefix = labels + "," if labels else ""
+        suffix = "{" + labels + "}" if labels else ""
+        total = 0
+        for bound, count in zip(self.buckets, self.counts):
+            total += count
+            yield f'{name}_bucket{{{prefix}le="{bound}"}} {total}'
+        total += self.counts[-1]
+        yield f'{name}_bucket{{{prefix}le="+Inf"}} {total}'
+        yield f"{name}_sum{suffix} {self.sum}"
+        yield f"{name}_count{suffix} {total}"
+
+
+# Requests by (method, route, status)
+request_counts: Dict[Tuple[str, str, int], int] = {}
+# Latency by (method, route)
+request_latency: Dict[Tuple[str, str], Histogram] = {}
+requests_in_flight = 0
+# Rate limit rejections by route
+rate_limited: Dict[str, int] = {}
+# Connections of the instrumented pools
+pools: List[Pool] = []
+pool_wait = Histogram(POOL_WAIT_BUCKETS)
+pool_hold = Histogram(POOL_HOLD_BUCKETS)
+pool_connects = 0
+
+
+def route_label(scope: Scope) -> str:
+    """Path template of the matched route, e.g. /lists/{list_id}/items."""
+    route = scope.get("route")
+    return route.path if route is not None else UNMATCHED_ROUTE
+
+
+def escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+class MetricsMiddleware:
+    """Count requests, statuses and latency per route.
+
+    Latency is measured until the last body part is sent, add it as the
+    outermost middleware so compression is included.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        global requests_in_flight
+        status_code = 500
+
+        async def send_with_status(message: Message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        requests_in_flight += 1
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            elapsed = time.perf_counter() - start
+            requests_in_flight -= 1
+
+            # The router stores the matched route in the scope
+            method = scope["method"]
+            route = route_label(scope)
+            key = (method, route, status_code)
+            request_counts[key] = request_counts.get(key, 0) + 1
+
+            histogram = request_latency.get((method, route))
+            if histogram is None:
+                histogram = request_latency[(method, route)] = Histogram(LATENCY_BUCKETS)
+            histogram.observe(elapsed)
+
+
+def rate_limit_exceeded_handler(request: Request, exc: RateLimitExceeded):
+    """Count the rejection and answer like slowapi."""
+    route = route_label(request.scope)
+    rate_limited[route] = rate_limited.get(route, 0) + 1
+    return _rate_limit_exceeded_handler(request, exc)
+
+
+def instrument_pool(pool: Pool):
+    """Time checkouts and how long connections are held, count opened connections.
+
+    The wait covers pool.connect, queueing for a free connection and opening
+    a new one. The checkout time is stored on the connection record.
+    """
+    pools.append(pool)
+    connect = pool.connect
+
+    @functools.wraps(connect)
+    def timed_connect():
+        start = time.perf_counter()
+        try:
+            return connect()
+        finally:
+            pool_wait.observe(time.perf_counter() - start)
+
+    # The engine checks connections out through the pool's connect attribute
+    pool.connect = timed_connect
+
+    @event.listens_for(pool, "connect")
+    def count_connect(dbapi_connection, connection_record):
+        global pool_connects
+        pool_connects += 1
+
+    @event.listens_for(pool, "checkout")
+    def start_hold(dbapi_connection, connection_record, connection_proxy):
+        connection_record.info["checked_out_at"] = time.perf_counter()
+
+    @event.listens_for(pool, "checkin")
+    def end_hold(dbapi_connection, connection_record):
+        start = connection_record.info.pop("checked_out_at", None)
+        if start is not None:
+            pool_hold.observe(time.perf_counter() - start)
+
+
+def render_metrics() -> str:
+    lines = [
+        "# HELP sharedcart_http_requests_total Requests by method, route and status code.",
+        "# TYPE sharedcart_http_requests_total counter",
+    ]
+    for (method, route, status_code), count in list(request_counts.items()):
+        lines.append(
+            f'sharedcart_http_requests_total{{method="{method}",route="{escape(route)}",status="{status_code}"}} {count}'
+        )
+
+    lines.append("# HELP sharedcart_http_request_duration_seconds Request latency by method and route.")
+    lines.append("# TYPE sharedcart_http_request_duration_seconds histogram")
+    for (method, route), histogram in list(request_latency.items()):
+        lines.extend(histogram.samples(
+            "sharedcart_http_request_duration_seconds", f'method="{method}",route="{escape(route)}"'
+        ))
+
+    lines.append("# HELP sharedcart_http_requests_in_flight Requests being served.")
+    lines.append("# TYPE sharedcart_http_requests_in_flight gauge")
+    lines.append(f"sharedcart_http_requests_in_flight {requests_in_flight}")
+
+    lines.append("# HELP sharedcart_rate_limited_total Requests rejected by the rate limiter by route.")
+    lines.append("# TYPE sharedcart_rate_limited_total counter")
+    for route, count in list(rate_limited.items()):
+        lines.append(f'sharedcart_rate_limited_total{{route="{escape(route)}"}} {count}')
+
+    lines.append("# HELP sharedcart_db_pool_checked_out Database connections checked out of the pools.")
+    lines.append("# TYPE sharedcart_db_pool_checked_out gauge")
+    # Pools without a fixed size, like NullPool, have no count
+    checked_out = sum(pool.checkedout() for pool in pools if hasattr(pool, "checkedout"))
+    lines.append(f"sharedcart_db_pool_checked_out {checked_out}")
+
+    lines.append("# HELP sharedcart_db_pool_connects_total Database connections opened by the pools.")
+    lines.append("# TYPE sharedcart_db_pool_connects_total counter")
+    lines.append(f"sharedcart_db_pool_connects_total {pool_connects}")
+
+    lines.append("# HELP sharedcart_db_pool_wait_seconds Time spent waiting for a connection from the pool.")
+    lines.append("# TYPE sharedcart_db_pool_wait_seconds histogram")
+    lines.extend(pool_wait.samples("sharedcart_db_pool_wait_seconds", ""))
+
+    lines.append("# HELP sharedcart_db_pool_hold_seconds Time a connection stays checked out of the pool.")
+    lines.append("# TYPE sharedcart_db_pool_hold_seconds histogram")
+    lines.extend(pool_hold.samples("sharedcart_db_pool_hold_seconds", ""))
+
+    return "\n".join(lines) + "\n"
+
+
+def check_metrics_token(request: Request, token: str):
+    """Require Authorization: Bearer <token>, without a configured token /metrics is not served."""
+    scheme, _, credentials = request.headers.get("Authorization", "").partition(" ")
+    if not token:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Not Found")
+    if scheme.lower() != "bearer" or not secrets.compare_digest(credentials.encode(), token.encode()):
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid metrics token",
+            headers={"WWW-Authenticate": "Bearer"}
+        )
+
+
+def metrics_response() -> PlainTextResponse:
+    return PlainTextResponse(render_metrics(), media_type=CONTENT_TYPE)
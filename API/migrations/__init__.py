@@ -0,0 +1,124 @@
+"""Versioned schema migrations.
+
+Every module named mNNNN_<name>.py in this package is a migration with an
+upgrade(connection) function, applied in version order. Applied versions
+are recorded in the SchemaMigrations table. Migrations check what already
+exists, so running one again (or on a database created by hand) is safe.
+Migrations define the tables and data logic they use themselves instead of
+importing API.models, so later model changes do not change what an old
+migration creates.
+"""
+import importlib
+import logging
+import pkgutil
+import re
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from typing import Callable, List, NamedTuple, Set
+
+from sqlalchemy import Column, DateTime, Integer, MetaData, String, Table, inspect, select, text
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.schema import Index
+
+from API.database import engine as default_engine
+
+logger = logging.getLogger("sharedcart.migrations")
+
+MODULE_PATTERN = re.compile(r"^m(\d{4})_(\w+)$")
+
+# Held while migrating so several workers starting at once do not race (MariaDB / MySQL)
+LOCK_NAME = "sharedcart_migrations"
+LOCK_TIMEOUT_SECONDS = 60
+
+schema_migrations = Table(
+    "SchemaMigrations",
+    MetaData(),
+    Column("version", Integer, primary_key=True, autoincrement=False),
+    Column("name", String(255), nullable=False),
+    Column("appliedAt", DateTime, nullable=False),
+)
+
+
+class Migration(NamedTuple):
+    version: int
+    name: str
+    upgrade: Callable[[Connection], None]
+
+
+def load_migrations() -> List[Migration]:
+    """Load all migrations of this package, ordered by version."""
+    migrations = []
+    for module_info in pkgutil.iter_modules(__path__):
+        match = MODULE_PATTERN.match(module_info.name)
+        if not match:
+            continue
+        module = importlib.import_module(f"{__name__}.{module_info.name}")
+        migrations.append(Migration(int(match.group(1)), match.group(2), module.upgrade))
+
+    migrations.sort(key=lambda m: m.version)
+    versions = [m.version for m in migrations]
+    if len(versions) != len(set(versions)):
+        raise RuntimeError(f"Duplicate migration versions: {versions}")
+    return migrations
+
+
+def get_applied_versions(connection: Connection) -> Set[int]:
+    """Get the versions recorded in SchemaMigrations."""
+    schema_migrations.create(connection, checkfirst=True)
+    return set(connection.execute(select(schema_migrations.c.version)).scalars())
+
+
+def create_index(connection: Connection, index: Index):
+    """Create an index unless a index with the same name exists."""
+    existing = {i["name"] for i in inspect(connection).get_indexes(index.table.name)}
+    if index.name not in existing:
+        index.create(connection)
+
+
+@contextmanager
+def migration_lock(connection: Connection):
+    """Serialize migrations between processes where the database supports it."""
+    if connection.dialect.name not in ("mysql", "mariadb"):
+        yield
+        return
+
+    acquired = connection.execute(
+        text("SELECT GET_LOCK(:name, :timeout)"), {"name": LOCK_NAME, "timeout": LOCK_TIMEOUT_SECONDS}
+    ).scalar()
+    if acquired != 1:
+        raise RuntimeError("Timed out waiting for the migration lock")
+    try:
+        yield
+    finally:
+        connection.execute(text("SELECT RELEASE_LOCK(:name)"), {"name": LOCK_NAME})
+
+
+def run_migrations(engine: Engine = default_engine) -> List[Migration]:
+    """Apply all pending migrations, returns the applied ones."""
+    applied = []
+
+    with engine.connect() as lock_connection, migration_lock(lock_connection):
+        with engine.begin() as connection:
+            done = get_applied_versions(connection)
+
+        for migration in load_migrations():
+            if migration.version in done:
+                continue
+
+            try:
+                with engine.begin() as connection:
+                    migration.upgrade(connection)
+                    connection.execute(schema_migrations.insert().values(
+                        version=migration.version,
+                        name=migration.name,
+                        appliedAt=datetime.now(timezone.utc).replace(tzinfo=None)
+                    ))
+            except IntegrityError:
+                # Recorded by another process in the meantime
+                continue
+
+            logger.info(f"Applied migration {migration.version:04d} {migration.name}")
+            applied.append(migration)
+
+    return applied
@@ -0,0 +1,47 @@
+"""Command line for the migrations.
+
+    python -m API.migrations upgrade       apply pending migrations
+    python -m API.migrations status        list migrations and whether they are applied
+    python -m API.migrations check-plans   fail if a hot query does a full table scan
+"""
+import argparse
+import logging
+import sys
+
+from API.database import engine
+from API.migrations import load_migrations, get_applied_versions, run_migrations
+from API.migrations.query_plans import find_full_scans
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(prog="python -m API.migrations")
+    parser.add_argument("command", choices=["upgrade", "status", "check-plans"], nargs="?", default="upgrade")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+
+    if args.command == "upgrade":
+        applied = run_migrations(engine)
+        print(f"{len(applied)} migration(s) applied")
+        return 0
+
+    if args.command == "status":
+        with engine.begin() as connection:
+            done = get_applied_versions(connection)
+        for migration in load_migrations():
+            state = "applied" if migration.version in done else "pending"
+            print(f"{migration.version:04d} {migration.name:<30} {state}")
+        return 0
+
+    with engine.connect() as connection:
+        full_scans = find_full_scans(connection)
+    for scan in full_scans:
+        print(f"FULL SCAN in '{scan.query}' on {scan.table}: {scan.detail}")
+    if full_scans:
+        return 1
+    print("No full table scans in the hot queries")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
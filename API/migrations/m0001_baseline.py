@@ -0,0 +1,67 @@
+"""Create the tables of the initial schema and the change log.
+
+The tables are defined here as they were at this revision, later model
+changes must not change what this migration creates.
+"""
+from sqlalchemy import Column, BigInteger, Boolean, DECIMAL, ForeignKey, Index, MetaData, String, Table, Text
+from sqlalchemy.engine import Connection
+
+metadata = MetaData()
+
+users = Table(
+    "Users", metadata,
+    Column("id", BigInteger, primary_key=True, index=True),
+    Column("username", String(255), unique=True, nullable=False),
+    Column("displayName", String(255), nullable=False),
+    Column("passwordHash", String(255), nullable=False),
+)
+
+groups = Table(
+    "Groups", metadata,
+    Column("id", BigInteger, primary_key=True, index=True),
+    Column("name", String(255), nullable=False),
+    Column("note", Text, nullable=True),
+    Column("color", String(50), nullable=True),
+    Column("inviteCode", String(20), unique=True, nullable=True),
+)
+
+user_groups = Table(
+    "UserGroups", metadata,
+    Column("userId", BigInteger, ForeignKey("Users.id"), primary_key=True),
+    Column("groupId", BigInteger, ForeignKey("Groups.id"), primary_key=True),
+)
+
+shopping_lists = Table(
+    "ShoppingLists", metadata,
+    Column("id", BigInteger, primary_key=True, index=True),
+    Column("groupId", BigInteger, ForeignKey("Groups.id"), nullable=False),
+    Column("name", String(255), nullable=False),
+    Column("note", Text, nullable=True),
+)
+
+shopping_items = Table(
+    "ShoppingItems", metadata,
+    Column("id", BigInteger, primary_key=True, index=True),
+    Column("shoppingListId", BigInteger, ForeignKey("ShoppingLists.id"), nullable=False),
+    Column("name", String(255), nullable=False),
+    Column("quantity", DECIMAL(10, 2), nullable=True),
+    Column("unit", String(50), nullable=True),
+    Column("note", Text, nullable=True),
+    Column("checked", Boolean, nullable=False),
+)
+
+changes = Table(
+    "Changes", metadata,
+    Column("id", BigInteger, primary_key=True, index=True),
+    Column("groupId", BigInteger, nullable=False),
+    Column("entity", String(20), nullable=False),
+    Column("entityId", BigInteger, nullable=False),
+    Index("ix_Changes_groupId_id", "groupId", "id"),
+    Index("ix_Changes_entity_entityId", "entity", "entityId"),
+)
+
+
+def upgrade(connection: Connection):
+    # Existing databases already have these, only missing tables are created
+    for table in (users, groups, user_groups, shopping_lists, shopping_items, changes):
+        table.create(connection, checkfirst=True)
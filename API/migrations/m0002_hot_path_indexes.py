@@ -0,0 +1,31 @@
+"""Indexes for the filters and sort orders of the hot queries."""
+from sqlalchemy import Column, BigInteger, Boolean, Index, MetaData, String, Table
+from sqlalchemy.engine import Connection
+
+from API.migrations import create_index
+
+# Only the indexed columns, as they were at this revision
+metadata = MetaData()
+shopping_items = Table(
+    "ShoppingItems", metadata,
+    Column("shoppingListId", BigInteger),
+    Column("checked", Boolean),
+    Column("name", String(255)),
+)
+shopping_lists = Table("ShoppingLists", metadata, Column("groupId", BigInteger))
+user_groups = Table("UserGroups", metadata, Column("groupId", BigInteger))
+
+INDEXES = [
+    # get_items_by_list: list id + checked filter + name sort
+    Index("ix_ShoppingItems_shoppingListId_checked_name",
+          shopping_items.c.shoppingListId, shopping_items.c.checked, shopping_items.c.name),
+    # Lists of the user's groups (lists, snapshot)
+    Index("ix_ShoppingLists_groupId", shopping_lists.c.groupId),
+    # Members of a group (member names, membership checks)
+    Index("ix_UserGroups_groupId", user_groups.c.groupId),
+]
+
+
+def upgrade(connection: Connection):
+    for index in INDEXES:
+        create_index(connection, index)
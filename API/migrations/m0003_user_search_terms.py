@@ -0,0 +1,75 @@
+"""Search terms for the user search, indexed for all existing users.
+
+The table and the tokenizer are copied as they were at this revision, so
+later changes to API.services.user_search do not change the backfill.
+"""
+from typing import Dict
+
+from sqlalchemy import Column, BigInteger, Index, MetaData, SmallInteger, String, Table, insert, select
+from sqlalchemy.dialects import mysql
+from sqlalchemy.engine import Connection
+
+from API.migrations import create_index
+
+TERM_LENGTH = 32
+NAME_START = 0
+WORD_START = 1
+INSIDE = 2
+
+metadata = MetaData()
+
+users = Table(
+    "Users", metadata,
+    Column("id", BigInteger, primary_key=True),
+    Column("username", String(255)),
+    Column("displayName", String(255)),
+)
+
+user_search_terms = Table(
+    "UserSearchTerms", metadata,
+    # Binary on MariaDB, otherwise folded terms of one user collide
+    Column("term", String(32).with_variant(mysql.VARCHAR(32, charset="utf8mb4", collation="utf8mb4_bin"),
+                                           "mysql", "mariadb"), primary_key=True),
+    Column("userId", BigInteger, primary_key=True),
+    Column("start", SmallInteger, nullable=False),
+    Index("ix_UserSearchTerms_userId", "userId"),
+    Index("ix_UserSearchTerms_start_term_userId", "start", "term", "userId"),
+)
+
+
+def search_terms(username: str, display_name: str) -> Dict[str, int]:
+    """Every suffix of both names with the best position it starts at."""
+    terms = {}
+    for name in (username, display_name):
+        name = name.lower()
+        for position, char in enumerate(name):
+            if char.isspace():
+                continue
+            if position == 0:
+                start = NAME_START
+            elif not name[position - 1].isalnum():
+                start = WORD_START
+            else:
+                start = INSIDE
+            term = name[position:position + TERM_LENGTH].rstrip()
+            if start < terms.get(term, INSIDE + 1):
+                terms[term] = start
+    return terms
+
+
+def upgrade(connection: Connection):
+    user_search_terms.create(connection, checkfirst=True)
+    for index in user_search_terms.indexes:
+        create_index(connection, index)
+
+    indexed = select(user_search_terms.c.userId)
+    rows = []
+    for user in connection.execute(
+        select(users.c.id, users.c.username, users.c.displayName).where(users.c.id.not_in(indexed))
+    ):
+        rows.extend(
+            {"term": term, "userId": user.id, "start": start}
+            for term, start in search_terms(user.username, user.displayName).items()
+        )
+    if rows:
+        connection.execute(insert(user_search_terms), rows)
@@ -0,0 +1,20 @@
+"""Insert time of change log entries, for safe cursors and pruning."""
+from datetime import datetime, timezone
+
+from sqlalchemy import Column, DateTime, MetaData, Table, inspect, update
+from sqlalchemy.engine import Connection
+
+metadata = MetaData()
+changes = Table("Changes", metadata, Column("createdAt", DateTime, nullable=True))
+
+
+def upgrade(connection: Connection):
+    if "createdAt" in {c["name"] for c in inspect(connection).get_columns("Changes")}:
+        return
+
+    quote = connection.dialect.identifier_preparer.quote
+    column_type = DateTime().compile(dialect=connection.dialect)
+    connection.exec_driver_sql(f"ALTER TABLE {quote('Changes')} ADD COLUMN {quote('createdAt')} {column_type} NULL")
+
+    # Existing entries count as created now, they are kept for the full retention period
+    connection.execute(update(changes).values(createdAt=datetime.now(timezone.utc).replace(tzinfo=None)))
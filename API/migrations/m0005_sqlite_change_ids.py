@@ -0,0 +1,42 @@
+"""Autoincrementing change ids on SQLite.
+
+SQLite only generates ids for INTEGER primary keys, the BIGINT id of the
+baseline made every change log insert fail. SQLite cannot change a column
+type, so the table is rebuilt. Other databases are not touched.
+"""
+from sqlalchemy import Column, BigInteger, DateTime, Index, Integer, MetaData, String, Table, inspect
+from sqlalchemy.engine import Connection
+
+metadata = MetaData()
+changes = Table(
+    "Changes", metadata,
+    Column("id", BigInteger().with_variant(Integer, "sqlite"), primary_key=True, index=True),
+    Column("groupId", BigInteger, nullable=False),
+    Column("entity", String(20), nullable=False),
+    Column("entityId", BigInteger, nullable=False),
+    Column("createdAt", DateTime, nullable=True),
+    Index("ix_Changes_groupId_id", "groupId", "id"),
+    Index("ix_Changes_entity_entityId", "entity", "entityId"),
+    sqlite_autoincrement=True,
+)
+
+
+def upgrade(connection: Connection):
+    if connection.dialect.name != "sqlite":
+        return
+    id_column = next(c for c in inspect(connection).get_columns("Changes") if c["name"] == "id")
+    if str(id_column["type"]) == "INTEGER":
+        return
+
+    quote = connection.dialect.identifier_preparer.quote
+    connection.exec_driver_sql(f"ALTER TABLE {quote('Changes')} RENAME TO {quote('Changes_old')}")
+    # The indexes moved with the old table, their names are needed for the new one
+    for index in inspect(connection).get_indexes("Changes_old"):
+        connection.exec_driver_sql(f"DROP INDEX {quote(index['name'])}")
+
+    changes.create(connection)
+    columns = ", ".join(quote(c.name) for c in changes.columns)
+    connection.exec_driver_sql(
+        f"INSERT INTO {quote('Changes')} ({columns}) SELECT {columns} FROM {quote('Changes_old')}"
+    )
+    connection.exec_driver_sql(f"DROP TABLE {quote('Changes_old')}")
@@ -0,0 +1,17 @@
+"""Binary collation for search terms on MariaDB.
+
+The default collation compares case and accent insensitive, so folded
+terms like "anna" and "änna" of one user collided in the primary key.
+Terms are lowercased already and compared by code point like in Python.
+"""
+from sqlalchemy.engine import Connection
+
+
+def upgrade(connection: Connection):
+    if connection.dialect.name not in ("mysql", "mariadb"):
+        return
+
+    connection.exec_driver_sql(
+        "ALTER TABLE `UserSearchTerms` "
+        "MODIFY `term` VARCHAR(32) CHARACTER SET utf8mb4 COLLATE utf8mb4_bin NOT NULL"
+    )
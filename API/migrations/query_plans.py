@@ -0,0 +1,97 @@
+"""EXPLAIN the hot queries and report the ones reading a whole table.
+
+A full scan reads every row of a table or of one of its indexes: "SCAN"
+instead of "SEARCH" on SQLite, access type ALL or index without any
+possible key on MariaDB / MySQL. MariaDB may still scan small tables when
+a usable index exists, those are not reported.
+"""
+from typing import Callable, Dict, List, NamedTuple
+
+from sqlalchemy import and_, or_, select
+from sqlalchemy.engine import Connection
+from sqlalchemy.sql import Select
+
+from API.models import User, Group, UserGroup, ShoppingList, ShoppingItem, Change, UserSearchTerm
+from API.services.changes import USER_GROUP
+
+
+class FullScan(NamedTuple):
+    query: str
+    table: str
+    detail: str
+
+
+# Sample parameters, the plan does not depend on the values
+HOT_QUERIES: Dict[str, Callable[[], Select]] = {
+    "items by list": lambda: select(ShoppingItem).where(
+        ShoppingItem.shoppingListId == 1
+    ),
+    "items by list, checked, sorted by name": lambda: select(ShoppingItem).where(
+        ShoppingItem.shoppingListId == 1, ShoppingItem.checked.is_(False)
+    ).order_by(ShoppingItem.name, ShoppingItem.id),
+    "lists of groups": lambda: select(ShoppingList).where(
+        ShoppingList.groupId.in_([1, 2, 3])
+    ).order_by(ShoppingList.id),
+    "items of groups": lambda: select(ShoppingItem).where(
+        ShoppingItem.shoppingListId.in_(select(ShoppingList.id).where(ShoppingList.groupId.in_([1, 2, 3])))
+    ),
+    "groups of user": lambda: select(UserGroup.groupId).where(
+        UserGroup.userId == 1
+    ),
+    "member names": lambda: select(UserGroup.groupId, User.displayName).join(
+        User, User.id == UserGroup.userId
+    ).where(UserGroup.groupId.in_([1, 2, 3])),
+    "list with access": lambda: select(ShoppingList, UserGroup.userId).outerjoin(
+        UserGroup, and_(UserGroup.groupId == ShoppingList.groupId, UserGroup.userId == 1)
+    ).where(ShoppingList.id == 1),
+    "item with access": lambda: select(ShoppingItem, ShoppingList.groupId, UserGroup.userId).join(
+        ShoppingList, ShoppingList.id == ShoppingItem.shoppingListId
+    ).outerjoin(
+        UserGroup, and_(UserGroup.groupId == ShoppingList.groupId, UserGroup.userId == 1)
+    ).where(ShoppingItem.id == 1),
+    "changes since cursor": lambda: select(Change).where(
+        Change.id > 1,
+        or_(Change.groupId.in_([1, 2, 3]), and_(Change.entity == USER_GROUP, Change.entityId == 1))
+    ).order_by(Change.id),
+    "user by username": lambda: select(User).where(User.username == "alice"),
+    "user search": lambda: select(UserSearchTerm.term, UserSearchTerm.userId).where(
+        UserSearchTerm.start == 1, UserSearchTerm.term >= "ali", UserSearchTerm.term < "alj"
+    ).order_by(UserSearchTerm.term, UserSearchTerm.userId).limit(40),
+    "group by invite code": lambda: select(Group).where(Group.inviteCode == "ABCD1234"),
+}
+
+
+def compile_query(query: Select, connection: Connection) -> str:
+    return str(query.compile(dialect=connection.dialect, compile_kwargs={"literal_binds": True}))
+
+
+def explain_sqlite(connection: Connection, sql: str, tables: List[str]) -> List[tuple]:
+    """Get (table, detail) of plan steps reading a whole table on SQLite."""
+    scans = []
+    for row in connection.exec_driver_sql("EXPLAIN QUERY PLAN " + sql):
+        detail = row[-1]
+        words = detail.split()
+        if len(words) >= 2 and words[0] == "SCAN" and words[1] in tables:
+            scans.append((words[1], detail))
+    return scans
+
+
+def explain_mysql(connection: Connection, sql: str, tables: List[str]) -> List[tuple]:
+    """Get (table, detail) of plan steps reading a whole table on MariaDB / MySQL."""
+    scans = []
+    for row in connection.exec_driver_sql("EXPLAIN " + sql).mappings():
+        if row["table"] in tables and row["type"] in ("ALL", "index") and not row["possible_keys"]:
+            scans.append((row["table"], f"type={row['type']} rows={row['rows']}"))
+    return scans
+
+
+def find_full_scans(connection: Connection) -> List[FullScan]:
+    """EXPLAIN every hot query, returns the full table scans."""
+    tables = [model.__tablename__ for model in (User, Group, UserGroup, ShoppingList, ShoppingItem, Change, UserSearchTerm)]
+    explain = explain_sqlite if connection.dialect.name == "sqlite" else explain_mysql
+
+    full_scans = []
+    for name, build in HOT_QUERIES.items():
+        for table, detail in explain(connection, compile_query(build(), connection), tables):
+            full_scans.append(FullScan(name, table, detail))
+    return full_scans
@@ -3,5 +3,7 @@ from API.models.group import Group
 from API.models.user_group import UserGroup
 from API.models.shopping_list import ShoppingList
 from API.models.shopping_item import ShoppingItem
+from API.models.change import Change
+from API.models.user_search_term import UserSearchTerm
 
-__all__ = ["User", "Group", "UserGroup", "ShoppingList", "ShoppingItem"]
+__all__ = ["User", "Group", "UserGroup", "ShoppingList", "ShoppingItem", "Change", "UserSearchTerm"]
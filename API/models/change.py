@@ -0,0 +1,23 @@
+from datetime import datetime
+from sqlalchemy import Column, BigInteger, DateTime, Integer, String, Index
+
+from API.database import Base
+
+
+class Change(Base):
+    __tablename__ = "Changes"
+    
+    # SQLite only autoincrements INTEGER primary keys
+    id = Column(BigInteger().with_variant(Integer, "sqlite"), primary_key=True, index=True)
+    groupId = Column(BigInteger, nullable=False)
+    entity = Column(String(20), nullable=False)
+    entityId = Column(BigInteger, nullable=False)
+    # Insert time (UTC), holds back cursors of changes that may not be committed yet
+    createdAt = Column(DateTime, nullable=True, default=datetime.utcnow)
+    
+    __table_args__ = (
+        Index("ix_Changes_groupId_id", "groupId", "id"),
+        Index("ix_Changes_entity_entityId", "entity", "entityId"),
+        # Ids of deleted (pruned) changes are never reused, cursors stay valid
+        {"sqlite_autoincrement": True},
+    )
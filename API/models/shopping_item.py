@@ -1,4 +1,4 @@
-from sqlalchemy import Column, BigInteger, String, Text, DECIMAL, Boolean, ForeignKey
+from sqlalchemy import Column, BigInteger, String, Text, DECIMAL, Boolean, ForeignKey, Index
 from sqlalchemy.orm import relationship
 
 from API.database import Base
@@ -16,3 +16,8 @@ class ShoppingItem(Base):
     checked = Column(Boolean, default=False, nullable=False)
     
     shoppingList = relationship("ShoppingList", back_populates="items")
+    
+    __table_args__ = (
+        # Items of a list, filtered by checked and sorted by name
+        Index("ix_ShoppingItems_shoppingListId_checked_name", "shoppingListId", "checked", "name"),
+    )
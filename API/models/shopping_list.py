@@ -1,4 +1,4 @@
-from sqlalchemy import Column, BigInteger, String, Text, ForeignKey
+from sqlalchemy import Column, BigInteger, String, Text, ForeignKey, Index
 from sqlalchemy.orm import relationship
 
 from API.database import Base
@@ -14,3 +14,7 @@ class ShoppingList(Base):
     
     group = relationship("Group", back_populates="shoppingLists")
     items = relationship("ShoppingItem", back_populates="shoppingList")
+    
+    __table_args__ = (
+        Index("ix_ShoppingLists_groupId", "groupId"),
+    )
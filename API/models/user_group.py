@@ -1,4 +1,4 @@
-from sqlalchemy import Column, BigInteger, ForeignKey
+from sqlalchemy import Column, BigInteger, ForeignKey, Index
 from sqlalchemy.orm import relationship
 
 from API.database import Base
@@ -12,4 +12,9 @@ class UserGroup(Base):
     
     user = relationship("User", back_populates="groups")
     group = relationship("Group", back_populates="users")
+    
+    __table_args__ = (
+        # The primary key starts with userId, members of a group need their own index
+        Index("ix_UserGroups_groupId", "groupId"),
+    )
 
@@ -0,0 +1,24 @@
+from sqlalchemy import Column, BigInteger, SmallInteger, String, Index
+from sqlalchemy.dialects import mysql
+
+from API.database import Base
+
+
+# Suffixes of usernames and display names, substring search becomes an index range scan
+class UserSearchTerm(Base):
+    __tablename__ = "UserSearchTerms"
+    
+    # Binary on MariaDB, its default collation treats "anna" and "änna" as the same key
+    term = Column(
+        String(32).with_variant(mysql.VARCHAR(32, charset="utf8mb4", collation="utf8mb4_bin"), "mysql", "mariadb"),
+        primary_key=True
+    )
+    userId = Column(BigInteger, primary_key=True)
+    # 0 = start of the name, 1 = start of a word, 2 = inside a word
+    start = Column(SmallInteger, nullable=False)
+    
+    __table_args__ = (
+        Index("ix_UserSearchTerms_userId", "userId"),
+        # Matches of one rank in term order, read without touching the table
+        Index("ix_UserSearchTerms_start_term_userId", "start", "term", "userId"),
+    )
@@ -1,19 +1,22 @@
 from slowapi import Limiter
 from slowapi.util import get_remote_address
 from fastapi import Request
-from jose import jwt
+
+from API.config import settings
+from API.auth.jwt_handler import get_request_claims
+import API.token_bucket  # noqa: F401 - registers the token-bucket strategy and storages
 
 def get_user_or_ip(request: Request) -> str:
-    auth_header = request.headers.get("Authorization")
-    if auth_header and auth_header.startswith("Bearer "):
-        try:
-            token = auth_header.split(" ")[1]
-            payload = jwt.get_unverified_claims(token)
-            user_id = payload.get("sub")
-            if user_id:
-                return f"user:{user_id}"
-        except Exception:
-            pass
+    # Only verified tokens get a bucket per user, forged ones count against the IP
+    claims = get_request_claims(request)
+    if claims is not None:
+        return f"user:{claims['sub']}"
     return f"ip:{get_remote_address(request)}"
 
-limiter = Limiter(key_func=get_user_or_ip)
+limiter = Limiter(
+    key_func=get_user_or_ip,
+    enabled=settings.rate_limit_enabled,
+    strategy="token-bucket",
+    storage_uri=f"bucket-{settings.rate_limit_backend}://",
+    storage_options={"path": settings.rate_limit_path} if settings.rate_limit_backend == "sqlite" else {}
+)
@@ -2,19 +2,33 @@ from fastapi import APIRouter, Depends, HTTPException, status, Request, Body
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from sqlalchemy.orm import Session
 
-from API.database import get_db
+from API.database import get_db, run_db, DatabaseRoute
 from API.models.user import User
 from API.schemas.user import UserCreate, UserLogin, UserResponse
 from API.schemas.auth import TokenResponse, TokenRefreshRequest
-from API.auth.password import hash_password, verify_password
-from API.auth.jwt_handler import create_access_token, create_refresh_token, verify_token
+from API.auth.password import hash_password_async, verify_password_async
+from API.auth.jwt_handler import create_access_token, create_refresh_token, verify_token, decode_token
 from API.auth.blacklist import add_to_blacklist
 from API.rate_limiter import limiter
+from API.services.user_search import index_user
 
-router = APIRouter(prefix="/auth", tags=["Authentication"])
+router = APIRouter(prefix="/auth", tags=["Authentication"], route_class=DatabaseRoute)
 security = HTTPBearer()
 
 
+def get_user_by_username(db: Session, username: str):
+    return db.query(User).filter(User.username == username).first()
+
+
+def add_user(db: Session, user: User) -> User:
+    db.add(user)
+    db.flush()
+    index_user(db, user)
+    db.commit()
+    db.refresh(user)
+    return user
+
+
 @router.post(
     "/register", 
     response_model=UserResponse, 
@@ -42,7 +56,7 @@ async def register(request: Request, db: Session = Depends(get_db)):
             detail="Invalid data format or missing fields"
         )
 
-    existing_user = db.query(User).filter(User.username == user_data.username).first()
+    existing_user = await run_db(db, get_user_by_username, user_data.username)
     if existing_user:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -52,23 +66,19 @@ async def register(request: Request, db: Session = Depends(get_db)):
     new_user = User(
         username=user_data.username,
         displayName=user_data.displayName,
-        passwordHash=hash_password(user_data.password)
+        passwordHash=await hash_password_async(user_data.password)
     )
     
-    db.add(new_user)
-    db.commit()
-    db.refresh(new_user)
-    
-    return new_user
+    return await run_db(db, add_user, new_user)
 
 
 @router.post("/login", response_model=TokenResponse)
 @limiter.limit("10/minute")
-def login(request: Request, credentials: UserLogin, db: Session = Depends(get_db)):
+async def login(request: Request, credentials: UserLogin, db: Session = Depends(get_db)):
     """Login and get tokens."""
-    user = db.query(User).filter(User.username == credentials.username).first()
+    user = await run_db(db, get_user_by_username, credentials.username)
     
-    if not user or not verify_password(credentials.password, user.passwordHash):
+    if not user or not await verify_password_async(credentials.password, user.passwordHash):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Invalid credentials"
@@ -110,5 +120,8 @@ def refresh_token(request: Request, token_request: TokenRefreshRequest, db: Sess
 @limiter.limit("30/minute")
 def logout(request: Request, credentials: HTTPAuthorizationCredentials = Depends(security)):
     """Logout and invalidate the current token."""
-    token = credentials.credentials
-    add_to_blacklist(token)
+    payload = decode_token(credentials.credentials, "access")
+    
+    # Invalid or expired tokens can no longer be used anyway
+    if payload is not None and "jti" in payload:
+        add_to_blacklist(payload["jti"], payload["exp"])
@@ -0,0 +1,158 @@
+import asyncio
+import json
+from fastapi import APIRouter, Depends, Request, Header, Query
+from fastapi.responses import StreamingResponse
+from sqlalchemy import or_, and_
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+from typing import List, Optional, Tuple
+
+from API.config import settings
+from API.database import SessionLocal
+from API.auth.dependencies import get_current_user
+from API.auth.user_cache import AuthenticatedUser
+from API.models.user_group import UserGroup
+from API.models.change import Change
+from API.services.changes import ChangeEvent, USER_GROUP, get_cursor_bounds, cursor_expired
+from API.services.events import event_hub, Subscription, RESYNC
+from API.rate_limiter import limiter
+
+router = APIRouter(prefix="/events", tags=["Events"])
+
+
+def format_change(change: ChangeEvent, safe_id: int) -> str:
+    """Format a change as a server-sent event, its id is a snapshot cursor.
+    
+    Like the snapshot cursor it does not pass safe_id, a client resuming
+    from it gets changes of slower transactions with lower ids again.
+    """
+    cursor = min(change.id, safe_id)
+    data = {
+        "groupId": change.groupId,
+        "entity": change.entity,
+        "entityId": change.entityId,
+        "cursor": str(cursor)
+    }
+    return f"id: {cursor}\nevent: change\ndata: {json.dumps(data)}\n\n"
+
+
+def format_resync() -> str:
+    """Tell the client to catch up with GET /snapshot?since=<last cursor>."""
+    return "event: resync\ndata: {}\n\n"
+
+
+def load_safe_id() -> int:
+    """Get the newest change id a resume cursor may advance to."""
+    db: Session = SessionLocal()
+    try:
+        return get_cursor_bounds(db)[1]
+    finally:
+        db.close()
+
+
+def open_subscription(
+    user_id: int,
+    since: Optional[int],
+    loop: asyncio.AbstractEventLoop
+) -> Tuple[Subscription, List[ChangeEvent], bool, int]:
+    """Subscribe to the user's groups and load the changes missed since the cursor.
+    
+    Subscribes before loading the replay so no change falls in between.
+    Returns the subscription, the missed changes, whether more changes
+    were missed than are replayed or the cursor is older than the change log,
+    and the safe id capping the cursors given out.
+    """
+    db: Session = SessionLocal()
+    try:
+        group_ids = {g for (g,) in db.query(UserGroup.groupId).filter(UserGroup.userId == user_id).all()}
+        subscription = event_hub.subscribe(user_id, group_ids, loop)
+        
+        oldest_id, safe_id = get_cursor_bounds(db)
+        if since is None:
+            return subscription, [], False, safe_id
+        
+        if cursor_expired(since, oldest_id):
+            return subscription, [], True, safe_id
+        
+        rows = db.query(Change).filter(
+            Change.id > since,
+            or_(
+                Change.groupId.in_(group_ids),
+                and_(Change.entity == USER_GROUP, Change.entityId == user_id)
+            )
+        ).order_by(Change.id).limit(settings.events_replay_limit + 1).all()
+        
+        changes = [ChangeEvent(c.id, c.groupId, c.entity, c.entityId) for c in rows]
+        truncated = len(changes) > settings.events_replay_limit
+        return subscription, changes[:settings.events_replay_limit], truncated, safe_id
+    finally:
+        db.close()
+
+
+async def stream_changes(subscription: Subscription, replay: List[ChangeEvent], truncated: bool, safe_id: int):
+    """Yield replayed and live changes with heartbeats until the client disconnects.
+    
+    The safe id is reloaded once it is change_cursor_safety_seconds old and
+    a newer change is sent, so the cursors of a long-lived stream keep advancing.
+    """
+    loop = asyncio.get_running_loop()
+    safe_id_loaded = loop.time()
+    
+    try:
+        if truncated:
+            yield format_resync()
+        
+        for change in replay:
+            yield format_change(change, safe_id)
+        
+        replayed_ids = {change.id for change in replay}
+        
+        while True:
+            try:
+                change = await asyncio.wait_for(
+                    subscription.queue.get(),
+                    timeout=settings.events_heartbeat_seconds
+                )
+            except asyncio.TimeoutError:
+                change = None
+                yield ": heartbeat\n\n"
+            
+            behind = change is None or change is RESYNC or change.id > safe_id
+            if behind and loop.time() - safe_id_loaded >= settings.change_cursor_safety_seconds:
+                safe_id = max(safe_id, await run_in_threadpool(load_safe_id))
+                safe_id_loaded = loop.time()
+            
+            if change is None:
+                continue
+            if change is RESYNC:
+                yield format_resync()
+            elif change.id not in replayed_ids:
+                yield format_change(change, safe_id)
+    finally:
+        event_hub.unsubscribe(subscription)
+
+
+@router.get("")
+@limiter.limit("10/minute")
+async def subscribe_changes(
+    request: Request,
+    since: Optional[str] = Query(None, description="Cursor to resume from"),
+    last_event_id: Optional[str] = Header(None),
+    current_user: AuthenticatedUser = Depends(get_current_user)
+):
+    """Stream change events of the user's groups as server-sent events.
+    
+    Reconnecting clients resume via the Last-Event-ID header or `since`.
+    """
+    cursor = last_event_id or since
+    cursor = int(cursor) if cursor and cursor.isdigit() else None
+    
+    subscription, replay, truncated, safe_id = await run_in_threadpool(
+        open_subscription, current_user.id, cursor, asyncio.get_running_loop()
+    )
+    
+    return StreamingResponse(
+        stream_changes(subscription, replay, truncated, safe_id),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
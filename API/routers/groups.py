@@ -4,7 +4,8 @@ from sqlalchemy.exc import SQLAlchemyError
 from typing import List
 import secrets
 
-from API.database import get_db
+from API.config import settings
+from API.database import get_db, DatabaseRoute
 from API.models.user import User
 from API.models.group import Group
 from API.models.user_group import UserGroup
@@ -12,9 +13,14 @@ from API.models.shopping_list import ShoppingList
 from API.models.shopping_item import ShoppingItem
 from API.schemas.group import GroupCreate, GroupUpdate, GroupResponse, GroupJoinRequest
 from API.auth.dependencies import get_current_user
+from API.auth.user_cache import AuthenticatedUser
+from API.services.changes import record_change, GROUP, USER_GROUP
+from API.services.members import get_member_names
+from API.services.access import is_member, require_membership, resolve_group
+from API.services.serialization import rows_response
 from API.rate_limiter import limiter
 
-router = APIRouter(prefix="/groups", tags=["Groups"])
+router = APIRouter(prefix="/groups", tags=["Groups"], route_class=DatabaseRoute)
 
 
 def generate_invite_code() -> str:
@@ -22,24 +28,25 @@ def generate_invite_code() -> str:
     return secrets.token_urlsafe(6)[:8].upper()
 
 
-def get_group_member_names(group_id: int, db: Session) -> List[str]:
-    """Get all members of a group with their display names."""
-    user_groups = db.query(UserGroup).filter(UserGroup.groupId == group_id).all()
-    user_ids = [ug.userId for ug in user_groups]
-    users = db.query(User).filter(User.id.in_(user_ids)).all()
-    return [u.displayName for u in users]
+def groups_to_response(groups: List[Group], db: Session) -> List[dict]:
+    """Convert groups to responses with members, loading all members at once."""
+    members = get_member_names([g.id for g in groups], db)
+    return [
+        {
+            "id": group.id,
+            "name": group.name,
+            "note": group.note,
+            "color": group.color,
+            "inviteCode": group.inviteCode,
+            "members": members[group.id]
+        }
+        for group in groups
+    ]
 
 
 def group_to_response(group: Group, db: Session) -> dict:
     """Convert group to response with members."""
-    return {
-        "id": group.id,
-        "name": group.name,
-        "note": group.note,
-        "color": group.color,
-        "inviteCode": group.inviteCode,
-        "members": get_group_member_names(group.id, db)
-    }
+    return groups_to_response([group], db)[0]
 
 
 @router.post("", response_model=GroupResponse, status_code=status.HTTP_201_CREATED)
@@ -47,7 +54,7 @@ def group_to_response(group: Group, db: Session) -> dict:
 def create_group(
     request: Request,
     group_data: GroupCreate,
-    current_user: User = Depends(get_current_user),
+    current_user: AuthenticatedUser = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
     """Create a new group and add current user as member."""
@@ -63,6 +70,8 @@ def create_group(
     
     user_group = UserGroup(userId=current_user.id, groupId=new_group.id)
     db.add(user_group)
+    record_change(db, new_group.id, GROUP, new_group.id)
+    record_change(db, new_group.id, USER_GROUP, current_user.id)
     db.commit()
     
     return group_to_response(new_group, db)
@@ -72,15 +81,17 @@ def create_group(
 @limiter.limit("120/minute")
 def get_my_groups(
     request: Request,
-    current_user: User = Depends(get_current_user),
+    current_user: AuthenticatedUser = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
     """Get all groups the current user is a member of."""
-    group_ids = db.query(UserGroup.groupId).filter(UserGroup.userId == current_user.id).all()
-    group_ids = [g[0] for g in group_ids]
-    
-    groups = db.query(Group).filter(Group.id.in_(group_ids)).all()
-    return [group_to_response(g, db) for g in groups]
+    groups = db.query(Group).join(UserGroup, UserGroup.groupId == Group.id).filter(
+        UserGroup.userId == current_user.id
+    ).all()
+    response = groups_to_response(groups, db)
+    if settings.fast_json:
+        return rows_response(response, GroupResponse)
+    return response
 
 
 @router.get("/{group_id}", response_model=GroupResponse)
@@ -88,27 +99,11 @@ def get_my_groups(
 def get_group(
     request: Request,
     group_id: int,
-    current_user: User = Depends(get_current_user),
+    current_user: AuthenticatedUser = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
     """Get a specific group."""
-    membership = db.query(UserGroup).filter(
-        UserGroup.userId == current_user.id,
-        UserGroup.groupId == group_id
-    ).first()
-    
-    if not membership:
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="Not a member of this group"
-        )
-    
-    group = db.query(Group).filter(Group.id == group_id).first()
-    if not group:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Group not found"
-        )
+    group = resolve_group(current_user.id, group_id, db)
     
     return group_to_response(group, db)
 
@@ -119,31 +114,16 @@ def update_group(
     request: Request,
     group_id: int,
     group_data: GroupUpdate,
-    current_user: User = Depends(get_current_user),
+    current_user: AuthenticatedUser = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
     """Update a group."""
-    membership = db.query(UserGroup).filter(
-        UserGroup.userId == current_user.id,
-        UserGroup.groupId == group_id
-    ).first()
-    
-    if not membership:
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="Not a member of this group"
-        )
-    
-    group = db.query(Group).filter(Group.id == group_id).first()
-    if not group:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Group not found"
-        )
+    group = resolve_group(current_user.id, group_id, db)
     
     group.name = group_data.name
     group.note = group_data.note
     group.color = group_data.color
+    record_change(db, group.id, GROUP, group.id)
     db.commit()
     db.refresh(group)
     
@@ -155,29 +135,19 @@ def update_group(
 def delete_group(
     request: Request,
     group_id: int,
-    current_user: User = Depends(get_current_user),
+    current_user: AuthenticatedUser = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
     """Delete a group."""
-    membership = db.query(UserGroup).filter(
-        UserGroup.userId == current_user.id,
-        UserGroup.groupId == group_id
-    ).first()
-    
-    if not membership:
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="Not a member of this group"
-        )
-    
-    group = db.query(Group).filter(Group.id == group_id).first()
-    if not group:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Group not found"
-        )
+    group = resolve_group(current_user.id, group_id, db)
     
     try:
+        # Every former member needs a membership tombstone, they can no longer see the group
+        member_ids = db.query(UserGroup.userId).filter(UserGroup.groupId == group_id).all()
+        for (member_id,) in member_ids:
+            record_change(db, group_id, USER_GROUP, member_id)
+        record_change(db, group_id, GROUP, group_id)
+        
         db.query(UserGroup).filter(UserGroup.groupId == group_id).delete(synchronize_session=False)
         list_ids_subq = db.query(ShoppingList.id).filter(ShoppingList.groupId == group_id).subquery()
         db.query(ShoppingItem).filter(ShoppingItem.shoppingListId.in_(list_ids_subq)).delete(synchronize_session=False)
@@ -194,7 +164,7 @@ def delete_group(
 def join_group_by_code(
     request: Request,
     join_data: GroupJoinRequest,
-    current_user: User = Depends(get_current_user),
+    current_user: AuthenticatedUser = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
     """Join a group using an invite code."""
@@ -206,12 +176,7 @@ def join_group_by_code(
             detail="Invalid invite code"
         )
     
-    existing = db.query(UserGroup).filter(
-        UserGroup.userId == current_user.id,
-        UserGroup.groupId == group.id
-    ).first()
-    
-    if existing:
+    if is_member(current_user.id, group.id, db):
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Already a member of this group"
@@ -219,6 +184,7 @@ def join_group_by_code(
     
     new_member = UserGroup(userId=current_user.id, groupId=group.id)
     db.add(new_member)
+    record_change(db, group.id, USER_GROUP, current_user.id)
     db.commit()
     
     return group_to_response(group, db)
@@ -229,29 +195,14 @@ def join_group_by_code(
 def regenerate_invite_code(
     request: Request,
     group_id: int,
-    current_user: User = Depends(get_current_user),
+    current_user: AuthenticatedUser = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
     """Generate a new invite code for the group."""
-    membership = db.query(UserGroup).filter(
-        UserGroup.userId == current_user.id,
-        UserGroup.groupId == group_id
-    ).first()
-    
-    if not membership:
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="Not a member of this group"
-        )
-    
-    group = db.query(Group).filter(Group.id == group_id).first()
-    if not group:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Group not found"
-        )
+    group = resolve_group(current_user.id, group_id, db)
     
     group.inviteCode = generate_invite_code()
+    record_change(db, group.id, GROUP, group.id)
     db.commit()
     db.refresh(group)
     
@@ -263,22 +214,21 @@ def regenerate_invite_code(
 def leave_group(
     request: Request,
     group_id: int,
-    current_user: User = Depends(get_current_user),
+    current_user: AuthenticatedUser = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
     """Leave a group."""
-    membership = db.query(UserGroup).filter(
-        UserGroup.userId == current_user.id,
-        UserGroup.groupId == group_id
-    ).first()
-    
-    if not membership:
+    if not is_member(current_user.id, group_id, db):
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Not a member of this group"
         )
     
-    db.delete(membership)
+    record_change(db, group_id, USER_GROUP, current_user.id)
+    db.query(UserGroup).filter(
+        UserGroup.userId == current_user.id,
+        UserGroup.groupId == group_id
+    ).delete(synchronize_session=False)
     db.commit()
 
 
@@ -288,20 +238,11 @@ def add_member(
     request: Request,
     group_id: int,
     user_id: int,
-    current_user: User = Depends(get_current_user),
+    current_user: AuthenticatedUser = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
     """Add a user to a group."""
-    membership = db.query(UserGroup).filter(
-        UserGroup.userId == current_user.id,
-        UserGroup.groupId == group_id
-    ).first()
-    
-    if not membership:
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="Not a member of this group"
-        )
+    require_membership(current_user.id, group_id, db)
     
     user = db.query(User).filter(User.id == user_id).first()
     if not user:
@@ -310,12 +251,7 @@ def add_member(
             detail="User not found"
         )
     
-    existing = db.query(UserGroup).filter(
-        UserGroup.userId == user_id,
-        UserGroup.groupId == group_id
-    ).first()
-    
-    if existing:
+    if is_member(user_id, group_id, db):
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="User is already a member"
@@ -323,6 +259,7 @@ def add_member(
     
     new_member = UserGroup(userId=user_id, groupId=group_id)
     db.add(new_member)
+    record_change(db, group_id, USER_GROUP, user_id)
     db.commit()
     
     return {"message": "Member added"}
@@ -334,31 +271,21 @@ def remove_member(
     request: Request,
     group_id: int,
     user_id: int,
-    current_user: User = Depends(get_current_user),
+    current_user: AuthenticatedUser = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
     """Remove a user from a group."""
-    membership = db.query(UserGroup).filter(
-        UserGroup.userId == current_user.id,
-        UserGroup.groupId == group_id
-    ).first()
+    require_membership(current_user.id, group_id, db)
     
-    if not membership:
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="Not a member of this group"
-        )
-    
-    member = db.query(UserGroup).filter(
-        UserGroup.userId == user_id,
-        UserGroup.groupId == group_id
-    ).first()
-    
-    if not member:
+    if not is_member(user_id, group_id, db):
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="User is not a member"
         )
     
-    db.delete(member)
+    record_change(db, group_id, USER_GROUP, user_id)
+    db.query(UserGroup).filter(
+        UserGroup.userId == user_id,
+        UserGroup.groupId == group_id
+    ).delete(synchronize_session=False)
     db.commit()
@@ -1,65 +1,43 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi import APIRouter, Depends, Request, Response, status, Query
+from sqlalchemy import and_
 from sqlalchemy.orm import Session
-from typing import List, Optional
+from typing import Dict, List, Optional
 
-from API.database import get_db
-from API.models.user import User
+from API.config import settings
+from API.database import get_db, DatabaseRoute
 from API.models.user_group import UserGroup
 from API.models.shopping_list import ShoppingList
 from API.models.shopping_item import ShoppingItem
-from API.schemas.shopping_item import ShoppingItemCreate, ShoppingItemUpdate, ShoppingItemResponse
+from API.schemas.shopping_item import (
+    ShoppingItemCreate, ShoppingItemUpdate, ShoppingItemResponse,
+    ShoppingItemBatchRequest, ShoppingItemBatchResponse, ShoppingItemOperationResult
+)
 from API.auth.dependencies import get_current_user
+from API.auth.user_cache import AuthenticatedUser
+from API.services.changes import record_change, SHOPPING_ITEM
+from API.services.access import resolve_list, resolve_item
+from API.services.pagination import KeysetPage, MAX_PAGE_SIZE
+from API.services.serialization import (
+    rows_response, rows_content, schema_columns, accepts_msgpack, msgpack_response
+)
 
-router = APIRouter(prefix="/items", tags=["Shopping Items"])
+router = APIRouter(prefix="/items", tags=["Shopping Items"], route_class=DatabaseRoute)
 
-
-def check_list_access(user_id: int, list_id: int, db: Session) -> ShoppingList:
-    """Check if user has access to list and return it."""
-    shopping_list = db.query(ShoppingList).filter(ShoppingList.id == list_id).first()
-    
-    if not shopping_list:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="List not found"
-        )
-    
-    membership = db.query(UserGroup).filter(
-        UserGroup.userId == user_id,
-        UserGroup.groupId == shopping_list.groupId
-    ).first()
-    
-    if not membership:
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="No access to this list"
-        )
-    
-    return shopping_list
-
-
-def check_item_access(user_id: int, item_id: int, db: Session) -> ShoppingItem:
-    """Check if user has access to item and return it."""
-    item = db.query(ShoppingItem).filter(ShoppingItem.id == item_id).first()
-    
-    if not item:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Item not found"
-        )
-    
-    check_list_access(user_id, item.shoppingListId, db)
-    
-    return item
+# Columns used by sort_by, the id is added as tie breaker when paginating
+ITEM_SORT_COLUMNS = {
+    "name": ShoppingItem.name,
+    "checked": ShoppingItem.checked,
+}
 
 
 @router.post("", response_model=ShoppingItemResponse, status_code=status.HTTP_201_CREATED)
 def create_item(
     item_data: ShoppingItemCreate,
-    current_user: User = Depends(get_current_user),
+    current_user: AuthenticatedUser = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
     """Add an item to a shopping list."""
-    check_list_access(current_user.id, item_data.shoppingListId, db)
+    shopping_list = resolve_list(current_user.id, item_data.shoppingListId, db)
     
     new_item = ShoppingItem(
         shoppingListId=item_data.shoppingListId,
@@ -69,23 +47,162 @@ def create_item(
         note=item_data.note
     )
     db.add(new_item)
+    db.flush()
+    record_change(db, shopping_list.groupId, SHOPPING_ITEM, new_item.id)
+    
+    # Serialize before the commit expires the row, so no refresh SELECT is needed
+    response = ShoppingItemResponse.model_validate(new_item)
     db.commit()
-    db.refresh(new_item)
     
-    return new_item
+    return response
+
+
+def get_accessible_lists(user_id: int, list_ids: List[int], db: Session) -> Dict[int, Optional[int]]:
+    """Check access to several lists in one query.
+    
+    Returns the group id of every existing list, None if the user has no access.
+    """
+    rows = db.query(ShoppingList.id, ShoppingList.groupId, UserGroup.userId).outerjoin(
+        UserGroup,
+        and_(UserGroup.groupId == ShoppingList.groupId, UserGroup.userId == user_id)
+    ).filter(
+        ShoppingList.id.in_(list_ids)
+    ).all()
+    
+    return {list_id: group_id if member_id is not None else None for list_id, group_id, member_id in rows}
+
+
+@router.post("/batch", response_model=ShoppingItemBatchResponse)
+def apply_item_batch(
+    batch: ShoppingItemBatchRequest,
+    current_user: AuthenticatedUser = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Apply several item operations in one transaction.
+    
+    Operations run in order. Invalid operations are reported in their result
+    and do not prevent the others from being applied.
+    """
+    operations = batch.operations
+    
+    item_ids = {op.id for op in operations if op.op != "create" and op.id is not None}
+    items = {}
+    if item_ids:
+        items = {item.id: item for item in db.query(ShoppingItem).filter(ShoppingItem.id.in_(item_ids)).all()}
+    
+    list_ids = {op.shoppingListId for op in operations if op.op == "create" and op.shoppingListId is not None}
+    list_ids.update(item.shoppingListId for item in items.values())
+    list_groups = get_accessible_lists(current_user.id, list(list_ids), db) if list_ids else {}
+    
+    results = [None] * len(operations)
+    created = []
+    changed = {}
+    deleted_ids = set()
+    
+    for index, op in enumerate(operations):
+        if op.op == "create":
+            if op.name is None:
+                results[index] = ShoppingItemOperationResult(
+                    status=status.HTTP_422_UNPROCESSABLE_ENTITY,
+                    detail="Name is required"
+                )
+                continue
+            if op.shoppingListId not in list_groups:
+                results[index] = ShoppingItemOperationResult(status=status.HTTP_404_NOT_FOUND, detail="List not found")
+                continue
+            if list_groups[op.shoppingListId] is None:
+                results[index] = ShoppingItemOperationResult(status=status.HTTP_403_FORBIDDEN, detail="No access to this list")
+                continue
+            
+            new_item = ShoppingItem(
+                shoppingListId=op.shoppingListId,
+                name=op.name,
+                quantity=op.quantity,
+                unit=op.unit,
+                note=op.note,
+                checked=bool(op.checked)
+            )
+            created.append((index, new_item))
+            continue
+        
+        item = items.get(op.id)
+        if item is None or item.id in deleted_ids:
+            results[index] = ShoppingItemOperationResult(status=status.HTTP_404_NOT_FOUND, detail="Item not found")
+            continue
+        if list_groups.get(item.shoppingListId) is None:
+            results[index] = ShoppingItemOperationResult(status=status.HTTP_403_FORBIDDEN, detail="No access to this list")
+            continue
+        
+        if op.op == "delete":
+            deleted_ids.add(item.id)
+            results[index] = ShoppingItemOperationResult(status=status.HTTP_204_NO_CONTENT)
+        else:
+            if op.op == "update":
+                if op.name is None:
+                    results[index] = ShoppingItemOperationResult(
+                        status=status.HTTP_422_UNPROCESSABLE_ENTITY,
+                        detail="Name is required"
+                    )
+                    continue
+                item.name = op.name
+                item.quantity = op.quantity
+                item.unit = op.unit
+                item.note = op.note
+            else:
+                # An explicit value keeps replayed offline toggles idempotent
+                item.checked = (not item.checked) if op.checked is None else op.checked
+            changed[index] = item
+        
+        record_change(db, list_groups[item.shoppingListId], SHOPPING_ITEM, item.id)
+    
+    # Flush inserts and updates first, the bulk delete bypasses the session
+    db.add_all([item for _, item in created])
+    db.flush()
+    if deleted_ids:
+        db.query(ShoppingItem).filter(ShoppingItem.id.in_(deleted_ids)).delete(synchronize_session=False)
+    
+    for index, item in created:
+        record_change(db, list_groups[item.shoppingListId], SHOPPING_ITEM, item.id)
+        results[index] = ShoppingItemOperationResult(
+            status=status.HTTP_201_CREATED,
+            item=ShoppingItemResponse.model_validate(item)
+        )
+    
+    # Serialize before the commit expires the rows, so no refresh SELECT is needed
+    for index, item in changed.items():
+        if item.id in deleted_ids:
+            results[index] = ShoppingItemOperationResult(status=status.HTTP_200_OK)
+        else:
+            results[index] = ShoppingItemOperationResult(
+                status=status.HTTP_200_OK,
+                item=ShoppingItemResponse.model_validate(item)
+            )
+    
+    db.commit()
+    
+    return ShoppingItemBatchResponse(results=results)
 
 
 @router.get("/list/{list_id}", response_model=List[ShoppingItemResponse])
 def get_items_by_list(
+    request: Request,
+    response: Response,
     list_id: int,
     sort_by: Optional[str] = Query(None, regex="^(name|checked)$"),
     sort_order: Optional[str] = Query("asc", regex="^(asc|desc)$"),
     checked: Optional[bool] = Query(None),
-    current_user: User = Depends(get_current_user),
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE, description="Page size, enables pagination"),
+    cursor: Optional[str] = Query(None, description="Cursor of the next page from the X-Next-Cursor header"),
+    current_user: AuthenticatedUser = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
-    """Get all items from a shopping list with optional sorting and filtering."""
-    check_list_access(current_user.id, list_id, db)
+    """Get all items from a shopping list with optional sorting and filtering.
+    
+    With `limit` or `cursor` one page is returned, the cursor of the next
+    page is sent in the X-Next-Cursor header.
+    Answers with MessagePack if requested by the Accept header.
+    """
+    resolve_list(current_user.id, list_id, db)
     
     query = db.query(ShoppingItem).filter(ShoppingItem.shoppingListId == list_id)
     
@@ -93,8 +210,19 @@ def get_items_by_list(
     if checked is not None:
         query = query.filter(ShoppingItem.checked == checked)
     
+    page = None
+    if limit is not None or cursor is not None:
+        sort_column = ITEM_SORT_COLUMNS.get(sort_by)
+        page = KeysetPage(
+            [sort_column, ShoppingItem.id] if sort_column is not None else [ShoppingItem.id],
+            descending=sort_order == "desc",
+            sort_key=f"{sort_by}:{sort_order}",
+            limit=limit,
+            cursor=cursor
+        )
+        query = page.apply(query)
     # Sorting
-    if sort_by == "name":
+    elif sort_by == "name":
         if sort_order == "desc":
             query = query.order_by(ShoppingItem.name.desc())
         else:
@@ -105,18 +233,36 @@ def get_items_by_list(
         else:
             query = query.order_by(ShoppingItem.checked.asc())
     
-    items = query.all()
+    use_msgpack = accepts_msgpack(request)
+    if use_msgpack or settings.fast_json:
+        items = query.with_entities(*schema_columns(ShoppingItem, ShoppingItemResponse)).all()
+    else:
+        items = query.all()
+    
+    # JSON and MessagePack are representations of the same URL, caches must key on Accept
+    headers = {"Vary": "Accept"}
+    if page is not None:
+        items = page.trim(items)
+        headers.update(page.headers())
+    
+    if use_msgpack:
+        return msgpack_response(rows_content(items, ShoppingItemResponse), headers=headers)
+    
+    if settings.fast_json:
+        return rows_response(items, ShoppingItemResponse, headers=headers)
+    
+    response.headers.update(headers)
     return items
 
 
 @router.get("/{item_id}", response_model=ShoppingItemResponse)
 def get_item(
     item_id: int,
-    current_user: User = Depends(get_current_user),
+    current_user: AuthenticatedUser = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
     """Get a specific item."""
-    item = check_item_access(current_user.id, item_id, db)
+    item, _ = resolve_item(current_user.id, item_id, db)
     return item
 
 
@@ -124,46 +270,51 @@ def get_item(
 def update_item(
     item_id: int,
     item_data: ShoppingItemUpdate,
-    current_user: User = Depends(get_current_user),
+    current_user: AuthenticatedUser = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
     """Update an item."""
-    item = check_item_access(current_user.id, item_id, db)
+    item, group_id = resolve_item(current_user.id, item_id, db)
     
     item.name = item_data.name
     item.quantity = item_data.quantity
     item.unit = item_data.unit
     item.note = item_data.note
+    record_change(db, group_id, SHOPPING_ITEM, item.id)
+    
+    response = ShoppingItemResponse.model_validate(item)
     db.commit()
-    db.refresh(item)
     
-    return item
+    return response
 
 
 @router.patch("/{item_id}/check", response_model=ShoppingItemResponse)
 def toggle_item_checked(
     item_id: int,
-    current_user: User = Depends(get_current_user),
+    current_user: AuthenticatedUser = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
     """Toggle item checked status."""
-    item = check_item_access(current_user.id, item_id, db)
+    item, group_id = resolve_item(current_user.id, item_id, db)
     
     item.checked = not item.checked
+    record_change(db, group_id, SHOPPING_ITEM, item.id)
+    
+    response = ShoppingItemResponse.model_validate(item)
     db.commit()
-    db.refresh(item)
     
-    return item
+    return response
 
 
 @router.delete("/{item_id}", status_code=status.HTTP_204_NO_CONTENT)
 def delete_item(
     item_id: int,
-    current_user: User = Depends(get_current_user),
+    current_user: AuthenticatedUser = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
     """Delete an item."""
-    item = check_item_access(current_user.id, item_id, db)
+    item, group_id = resolve_item(current_user.id, item_id, db)
     
+    record_change(db, group_id, SHOPPING_ITEM, item.id)
     db.delete(item)
     db.commit()
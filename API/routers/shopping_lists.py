@@ -1,40 +1,34 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, Query, Request, Response, status
+from sqlalchemy import select
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Optional
 
-from API.database import get_db
-from API.models.user import User
+from API.config import settings
+from API.database import get_db, DatabaseRoute
 from API.models.user_group import UserGroup
 from API.models.shopping_list import ShoppingList
 from API.models.shopping_item import ShoppingItem
 from API.schemas.shopping_list import ShoppingListCreate, ShoppingListUpdate, ShoppingListResponse
 from API.auth.dependencies import get_current_user
+from API.auth.user_cache import AuthenticatedUser
+from API.services.changes import record_change, SHOPPING_LIST
+from API.services.access import require_membership, resolve_list
+from API.services.pagination import KeysetPage, MAX_PAGE_SIZE
+from API.services.serialization import (
+    rows_response, rows_content, schema_columns, accepts_msgpack, msgpack_response
+)
 
-router = APIRouter(prefix="/lists", tags=["Shopping Lists"])
-
-
-def check_group_access(user_id: int, group_id: int, db: Session):
-    """Check if user has access to group."""
-    membership = db.query(UserGroup).filter(
-        UserGroup.userId == user_id,
-        UserGroup.groupId == group_id
-    ).first()
-    
-    if not membership:
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="No access to this group"
-        )
+router = APIRouter(prefix="/lists", tags=["Shopping Lists"], route_class=DatabaseRoute)
 
 
 @router.post("", response_model=ShoppingListResponse, status_code=status.HTTP_201_CREATED)
 def create_list(
     list_data: ShoppingListCreate,
-    current_user: User = Depends(get_current_user),
+    current_user: AuthenticatedUser = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
     """Create a new shopping list."""
-    check_group_access(current_user.id, list_data.groupId, db)
+    require_membership(current_user.id, list_data.groupId, db, "No access to this group")
     
     new_list = ShoppingList(
         groupId=list_data.groupId,
@@ -42,43 +36,72 @@ def create_list(
         note=list_data.note
     )
     db.add(new_list)
+    db.flush()
+    record_change(db, new_list.groupId, SHOPPING_LIST, new_list.id)
+    
+    # Serialize before the commit expires the row, so no refresh SELECT is needed
+    response = ShoppingListResponse.model_validate(new_list)
     db.commit()
-    db.refresh(new_list)
     
-    return new_list
+    return response
 
 
 @router.get("", response_model=List[ShoppingListResponse])
 def get_my_lists(
-    current_user: User = Depends(get_current_user),
+    request: Request,
+    response: Response,
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE, description="Page size, enables pagination"),
+    cursor: Optional[str] = Query(None, description="Cursor of the next page from the X-Next-Cursor header"),
+    current_user: AuthenticatedUser = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
-    """Get all shopping lists from user's groups."""
+    """Get all shopping lists from user's groups.
+    
+    With `limit` or `cursor` one page ordered by id is returned, the cursor
+    of the next page is sent in the X-Next-Cursor header.
+    Answers with MessagePack if requested by the Accept header.
+    """
     # Get user's groups
-    group_ids = db.query(UserGroup.groupId).filter(UserGroup.userId == current_user.id).all()
-    group_ids = [g[0] for g in group_ids]
+    group_ids = select(UserGroup.groupId).where(UserGroup.userId == current_user.id)
     
     # Get lists from those groups
-    lists = db.query(ShoppingList).filter(ShoppingList.groupId.in_(group_ids)).all()
+    query = db.query(ShoppingList).filter(ShoppingList.groupId.in_(group_ids))
+    
+    page = None
+    if limit is not None or cursor is not None:
+        page = KeysetPage([ShoppingList.id], descending=False, sort_key="id", limit=limit, cursor=cursor)
+        query = page.apply(query)
+    
+    use_msgpack = accepts_msgpack(request)
+    if use_msgpack or settings.fast_json:
+        lists = query.with_entities(*schema_columns(ShoppingList, ShoppingListResponse)).all()
+    else:
+        lists = query.all()
+    
+    # JSON and MessagePack are representations of the same URL, caches must key on Accept
+    headers = {"Vary": "Accept"}
+    if page is not None:
+        lists = page.trim(lists)
+        headers.update(page.headers())
+    
+    if use_msgpack:
+        return msgpack_response(rows_content(lists, ShoppingListResponse), headers=headers)
+    
+    if settings.fast_json:
+        return rows_response(lists, ShoppingListResponse, headers=headers)
+    
+    response.headers.update(headers)
     return lists
 
 
 @router.get("/{list_id}", response_model=ShoppingListResponse)
 def get_list(
     list_id: int,
-    current_user: User = Depends(get_current_user),
+    current_user: AuthenticatedUser = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
     """Get a specific shopping list."""
-    shopping_list = db.query(ShoppingList).filter(ShoppingList.id == list_id).first()
-    
-    if not shopping_list:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="List not found"
-        )
-    
-    check_group_access(current_user.id, shopping_list.groupId, db)
+    shopping_list = resolve_list(current_user.id, list_id, db, "No access to this group")
     
     return shopping_list
 
@@ -87,47 +110,35 @@ def get_list(
 def update_list(
     list_id: int,
     list_data: ShoppingListUpdate,
-    current_user: User = Depends(get_current_user),
+    current_user: AuthenticatedUser = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
     """Update a shopping list."""
-    shopping_list = db.query(ShoppingList).filter(ShoppingList.id == list_id).first()
-    
-    if not shopping_list:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="List not found"
-        )
-    
-    check_group_access(current_user.id, shopping_list.groupId, db)
+    shopping_list = resolve_list(current_user.id, list_id, db, "No access to this group")
     
     shopping_list.name = list_data.name
     shopping_list.note = list_data.note
+    record_change(db, shopping_list.groupId, SHOPPING_LIST, shopping_list.id)
+    
+    response = ShoppingListResponse.model_validate(shopping_list)
     db.commit()
-    db.refresh(shopping_list)
     
-    return shopping_list
+    return response
 
 
 @router.delete("/{list_id}", status_code=status.HTTP_204_NO_CONTENT)
 def delete_list(
     list_id: int,
-    current_user: User = Depends(get_current_user),
+    current_user: AuthenticatedUser = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
     """Delete a shopping list."""
-    shopping_list = db.query(ShoppingList).filter(ShoppingList.id == list_id).first()
-    
-    if not shopping_list:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="List not found"
-        )
-    
-    check_group_access(current_user.id, shopping_list.groupId, db)
+    shopping_list = resolve_list(current_user.id, list_id, db, "No access to this group")
     
     # Manually delete items first to avoid IntegrityError (NOT NULL constraint)
     db.query(ShoppingItem).filter(ShoppingItem.shoppingListId == list_id).delete(synchronize_session=False)
     
+    # The list tombstone implies its items for delta sync clients
+    record_change(db, shopping_list.groupId, SHOPPING_LIST, shopping_list.id)
     db.delete(shopping_list)
     db.commit()
@@ -1,72 +1,366 @@
-from fastapi import APIRouter, Depends, Request
+from fastapi import APIRouter, Depends, Request, Response, Query, status
+from fastapi.responses import StreamingResponse
+from sqlalchemy import or_, and_, select
 from sqlalchemy.orm import Session
+from typing import Dict, Iterable, Iterator, List, Optional, Set
+import hashlib
+import json
 
-from API.database import get_db
+from API.config import settings
+from API.database import get_db, SessionLocal, DatabaseRoute
 from API.auth.dependencies import get_current_user
-from API.models.user import User
+from API.auth.user_cache import AuthenticatedUser
 from API.models.group import Group
-from API.models.user_group import UserGroup
 from API.models.shopping_list import ShoppingList
 from API.models.shopping_item import ShoppingItem
-from API.schemas.snapshot import Snapshot, GroupSnapshot
+from API.models.change import Change
+from API.schemas.snapshot import (
+    Snapshot, UserSnapshot, GroupSnapshot, UserGroupSnapshot, ShoppingListSnapshot, ShoppingItemSnapshot,
+    SnapshotTombstones
+)
+from API.services.changes import (
+    get_user_versions, get_cursor_bounds, cursor_expired, version_floor,
+    GROUP, USER_GROUP, SHOPPING_LIST, SHOPPING_ITEM
+)
+from API.services.members import get_member_names
+from API.services.snapshot_cache import fragment_cache, GroupFragment
+from API.services.serialization import (
+    model_response, schema_columns, accepts_msgpack, msgpack_response, json_response, to_columns
+)
 from API.rate_limiter import limiter
+from API.compression import cached_compressed_response, etag_variants
 
-router = APIRouter(prefix="/snapshot", tags=["Snapshot"])
+router = APIRouter(prefix="/snapshot", tags=["Snapshot"], route_class=DatabaseRoute)
 
+# Rows fetched per cursor round-trip and bytes per chunk when streaming
+STREAM_BATCH_SIZE = 500
+STREAM_CHUNK_SIZE = 64 * 1024
 
-def get_group_member_names(group_id: int, db: Session) -> list:
-    """Get display names of all group members."""
-    user_groups = db.query(UserGroup).filter(UserGroup.groupId == group_id).all()
-    user_ids = [ug.userId for ug in user_groups]
-    users = db.query(User).filter(User.id.in_(user_ids)).all()
-    return [u.displayName for u in users]
 
-
-@router.get("", response_model=Snapshot)
-@limiter.limit("70/minute")
-def get_snapshot(
-    request: Request,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
-):
-    """Get all data for current user in one request."""
-    
-    user_groups = db.query(UserGroup).filter(
-        UserGroup.userId == current_user.id
-    ).all()
-    
-    group_ids = [ug.groupId for ug in user_groups]
-    
-    groups = db.query(Group).filter(
-        Group.id.in_(group_ids)
-    ).all()
-    
-    groups_with_members = [
+def groups_to_snapshot(groups: List[Group], db: Session) -> List[GroupSnapshot]:
+    """Convert groups to snapshots with members, loading all members at once."""
+    members = get_member_names([g.id for g in groups], db)
+    return [
         GroupSnapshot(
             id=g.id,
             name=g.name,
             note=g.note,
             color=g.color,
             inviteCode=g.inviteCode,
-            members=get_group_member_names(g.id, db)
+            members=members[g.id]
         )
         for g in groups
     ]
-    
+
+
+def parse_cursor(since: Optional[str]) -> Optional[int]:
+    """Parse a snapshot cursor, returns None if it is missing or malformed."""
+    if since is None or not since.isdigit():
+        return None
+    return int(since)
+
+
+def make_etag(current_user: AuthenticatedUser, version: int, cursor: Optional[int], next_cursor: int,
+              variant: str = "") -> str:
+    """Build a strong ETag for a snapshot response without building the snapshot.
+
+    Every encoding of the snapshot (streamed, MessagePack, columnar) is a
+    different representation and gets its own ETag through the variant.
+    """
+    key = f"{current_user.id}:{current_user.displayName}:{version}:{cursor}:{next_cursor}:{variant}"
+    return '"' + hashlib.sha256(key.encode()).hexdigest()[:32] + '"'
+
+
+def matching_etag(if_none_match: Optional[str], etag: str) -> Optional[str]:
+    """Get the tag of an If-None-Match header naming the ETag or one of its compressed bodies."""
+    if not if_none_match:
+        return None
+    variants = etag_variants(etag)
+    for tag in if_none_match.split(","):
+        tag = tag.strip()
+        if tag == "*":
+            return etag
+        if tag in variants:
+            return tag
+    return None
+
+
+def build_group_fragments(group_versions: Dict[int, int], db: Session) -> Dict[int, GroupFragment]:
+    """Load the snapshot fragments of several groups with one query per table."""
+    group_ids = list(group_versions)
+
+    groups = db.query(Group).filter(
+        Group.id.in_(group_ids)
+    ).all()
+
     shopping_lists = db.query(ShoppingList).filter(
         ShoppingList.groupId.in_(group_ids)
-    ).all()
-    
-    list_ids = [sl.id for sl in shopping_lists]
-    
+    ).order_by(ShoppingList.id).all()
+
+    list_groups = {sl.id: sl.groupId for sl in shopping_lists}
+
     shopping_items = db.query(ShoppingItem).filter(
-        ShoppingItem.shoppingListId.in_(list_ids)
-    ).all()
-    
+        ShoppingItem.shoppingListId.in_(list_groups)
+    ).order_by(ShoppingItem.id).all()
+
+    lists_by_group = {g.id: [] for g in groups}
+    for sl in shopping_lists:
+        lists_by_group[sl.groupId].append(ShoppingListSnapshot.model_validate(sl))
+
+    items_by_group = {g.id: [] for g in groups}
+    for si in shopping_items:
+        items_by_group[list_groups[si.shoppingListId]].append(ShoppingItemSnapshot.model_validate(si))
+
+    return {
+        group.id: GroupFragment(
+            version=group_versions[group.id],
+            group=group_snapshot,
+            shoppingLists=lists_by_group[group.id],
+            shoppingItems=items_by_group[group.id]
+        )
+        for group, group_snapshot in zip(groups, groups_to_snapshot(groups, db))
+    }
+
+
+def get_full_snapshot(current_user: AuthenticatedUser, next_cursor: int, group_versions: Dict[int, int], db: Session) -> Snapshot:
+    """Build the complete snapshot for a user from cached group fragments.
+
+    The versions must be read before the rows so changes committed while
+    building are sent again with the next delta.
+    """
+    fragments = fragment_cache.get_many(group_versions)
+
+    missing = {g: v for g, v in group_versions.items() if g not in fragments}
+    if missing:
+        for group_id, fragment in build_group_fragments(missing, db).items():
+            fragment_cache.put(group_id, fragment)
+            fragments[group_id] = fragment
+
+    ordered = [fragments[g] for g in sorted(group_versions) if g in fragments]
+
     return Snapshot(
         user=current_user,
-        groups=groups_with_members,
-        userGroups=user_groups,
+        groups=[f.group for f in ordered],
+        userGroups=[UserGroupSnapshot(userId=current_user.id, groupId=f.group.id) for f in ordered],
+        shoppingLists=[sl for f in ordered for sl in f.shoppingLists],
+        shoppingItems=[si for f in ordered for si in f.shoppingItems],
+        cursor=str(next_cursor)
+    )
+
+
+def get_delta_snapshot(current_user: AuthenticatedUser, since: int, next_cursor: int, group_ids: Set[int],
+                       db: Session) -> Snapshot:
+    """Build a snapshot containing only rows changed after the cursor.
+
+    Groups the user joined since the cursor are sent in full. Changes after
+    next_cursor are sent again with the next delta.
+    """
+    changes = db.query(Change).filter(
+        Change.id > since,
+        or_(
+            Change.groupId.in_(group_ids),
+            and_(Change.entity == USER_GROUP, Change.entityId == current_user.id)
+        )
+    ).order_by(Change.id).all()
+
+    joined_ids = set()
+    left_ids = set()
+    changed = {GROUP: set(), SHOPPING_LIST: set(), SHOPPING_ITEM: set()}
+
+    for change in changes:
+        if change.entity == USER_GROUP and change.entityId == current_user.id:
+            if change.groupId in group_ids:
+                joined_ids.add(change.groupId)
+            else:
+                left_ids.add(change.groupId)
+        elif change.entity == USER_GROUP:
+            # Another member joined or left, the member names changed
+            changed[GROUP].add(change.groupId)
+        else:
+            changed[change.entity].add(change.entityId)
+
+    deleted = SnapshotTombstones(
+        groups=sorted(left_ids),
+        userGroups=[UserGroupSnapshot(userId=current_user.id, groupId=g) for g in sorted(left_ids)]
+    )
+
+    groups = []
+    group_query_ids = (changed[GROUP] & group_ids) | joined_ids
+    if group_query_ids:
+        groups = db.query(Group).filter(Group.id.in_(group_query_ids)).all()
+
+    shopping_lists = []
+    if changed[SHOPPING_LIST] or joined_ids:
+        shopping_lists = db.query(ShoppingList).filter(
+            or_(
+                ShoppingList.id.in_(changed[SHOPPING_LIST]),
+                ShoppingList.groupId.in_(joined_ids)
+            )
+        ).all()
+        found_ids = {sl.id for sl in shopping_lists}
+        deleted.shoppingLists = sorted(changed[SHOPPING_LIST] - found_ids)
+
+    shopping_items = []
+    if changed[SHOPPING_ITEM] or joined_ids:
+        joined_list_ids = db.query(ShoppingList.id).filter(
+            ShoppingList.groupId.in_(joined_ids)
+        ).scalar_subquery()
+        shopping_items = db.query(ShoppingItem).filter(
+            or_(
+                ShoppingItem.id.in_(changed[SHOPPING_ITEM]),
+                ShoppingItem.shoppingListId.in_(joined_list_ids)
+            )
+        ).all()
+        found_ids = {si.id for si in shopping_items}
+        deleted.shoppingItems = sorted(changed[SHOPPING_ITEM] - found_ids)
+
+    return Snapshot(
+        user=current_user,
+        groups=groups_to_snapshot(groups, db),
+        userGroups=[UserGroupSnapshot(userId=current_user.id, groupId=g) for g in sorted(joined_ids)],
         shoppingLists=shopping_lists,
-        shoppingItems=shopping_items
+        shoppingItems=shopping_items,
+        deleted=deleted,
+        cursor=str(next_cursor)
     )
+
+
+def encode_rows(rows, schema) -> Iterator[str]:
+    """Encode rows as the elements of a JSON array."""
+    separator = ""
+    for row in rows:
+        yield separator + schema.model_validate(row).model_dump_json()
+        separator = ","
+
+
+def join_chunks(parts: Iterable[str], chunk_size: int = STREAM_CHUNK_SIZE) -> Iterator[bytes]:
+    """Merge small JSON parts into chunks of about chunk_size bytes."""
+    buffer = []
+    size = 0
+    for part in parts:
+        buffer.append(part)
+        size += len(part)
+        if size >= chunk_size:
+            yield "".join(buffer).encode()
+            buffer = []
+            size = 0
+    if buffer:
+        yield "".join(buffer).encode()
+
+
+def stream_full_snapshot(current_user: AuthenticatedUser, next_cursor: int, group_ids: List[int]) -> Iterator[str]:
+    """Encode a full snapshot incrementally while reading lists and items from DB cursors.
+
+    Uses its own session since the request's session is closed before the
+    response body is sent.
+    """
+    db = SessionLocal()
+    try:
+        groups = db.query(Group).filter(Group.id.in_(group_ids)).order_by(Group.id).all()
+
+        yield '{"user":' + UserSnapshot.model_validate(current_user).model_dump_json()
+        yield ',"groups":['
+        yield from encode_rows(groups_to_snapshot(groups, db), GroupSnapshot)
+        yield '],"userGroups":['
+        yield from encode_rows(
+            [UserGroupSnapshot(userId=current_user.id, groupId=g) for g in sorted(group_ids)],
+            UserGroupSnapshot
+        )
+
+        shopping_lists = db.execute(
+            select(*schema_columns(ShoppingList, ShoppingListSnapshot)).where(
+                ShoppingList.groupId.in_(group_ids)
+            ).order_by(ShoppingList.id).execution_options(yield_per=STREAM_BATCH_SIZE)
+        )
+        yield '],"shoppingLists":['
+        yield from encode_rows(shopping_lists, ShoppingListSnapshot)
+
+        list_ids = select(ShoppingList.id).where(ShoppingList.groupId.in_(group_ids))
+        shopping_items = db.execute(
+            select(*schema_columns(ShoppingItem, ShoppingItemSnapshot)).where(
+                ShoppingItem.shoppingListId.in_(list_ids)
+            ).order_by(ShoppingItem.id).execution_options(yield_per=STREAM_BATCH_SIZE)
+        )
+        yield '],"shoppingItems":['
+        yield from encode_rows(shopping_items, ShoppingItemSnapshot)
+
+        yield '],"deleted":null,"cursor":' + json.dumps(str(next_cursor)) + "}"
+    finally:
+        db.close()
+
+
+@router.get("", response_model=Snapshot)
+@limiter.limit("70/minute")
+def get_snapshot(
+    request: Request,
+    response: Response,
+    since: Optional[str] = Query(None, description="Cursor from a previous snapshot, returns only changes"),
+    stream: bool = Query(False, description="Stream full snapshots in chunks instead of building them in memory"),
+    columnar: bool = Query(False, description="Send shoppingItems as one array of values per field"),
+    db: Session = Depends(get_db),
+    current_user: AuthenticatedUser = Depends(get_current_user)
+):
+    """Get all data for current user in one request.
+
+    With a cursor only changed rows and tombstones are returned. A response
+    without `deleted` is a full snapshot and replaces the client state.
+    Answers 304 if the If-None-Match header matches the current ETag.
+    Large accounts can use `stream` to keep memory use flat (JSON only).
+    Answers with MessagePack if requested by the Accept header.
+    """
+    oldest_id, safe_id = get_cursor_bounds(db)
+    version, group_versions = get_user_versions(db, current_user.id, version_floor(oldest_id))
+
+    # Unknown and pruned cursors get a full snapshot
+    cursor = parse_cursor(since)
+    if cursor is not None and (cursor > version or cursor_expired(cursor, oldest_id)):
+        cursor = None
+
+    # The returned cursor never passes changes that may still have uncommitted predecessors
+    next_cursor = max(cursor or 0, min(version, safe_id))
+
+    use_msgpack = accepts_msgpack(request)
+    stream = stream and cursor is None and not use_msgpack and not columnar
+
+    variant = "+".join(name for name, enabled in [
+        ("stream", stream), ("msgpack", use_msgpack), ("columnar", columnar)
+    ] if enabled)
+    etag = make_etag(current_user, version, cursor, next_cursor, variant)
+    headers = {"ETag": etag, "Vary": "Accept, Accept-Encoding"}
+
+    # The 304 names the body the client has, plain or compressed
+    matched = matching_etag(request.headers.get("If-None-Match"), etag)
+    if matched is not None:
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={**headers, "ETag": matched})
+
+    # Repeated polls without a matching If-None-Match skip building and compressing
+    cached = cached_compressed_response(request, etag, headers)
+    if cached is not None:
+        return cached
+
+    if stream:
+        return StreamingResponse(
+            join_chunks(stream_full_snapshot(current_user, next_cursor, list(group_versions))),
+            media_type="application/json",
+            headers=headers
+        )
+
+    if cursor is None:
+        snapshot = get_full_snapshot(current_user, next_cursor, group_versions, db)
+    else:
+        snapshot = get_delta_snapshot(current_user, cursor, next_cursor, set(group_versions), db)
+
+    if use_msgpack or columnar:
+        content = snapshot.model_dump(mode="json")
+        if columnar:
+            content["shoppingItems"] = to_columns(content["shoppingItems"], ShoppingItemSnapshot)
+        if use_msgpack:
+            return msgpack_response(content, headers=headers)
+        return json_response(content, headers=headers)
+
+    if settings.fast_json:
+        # The snapshot is already validated, encode it once without the response_model pass
+        return model_response(snapshot, headers=headers)
+
+    response.headers.update(headers)
+    return snapshot
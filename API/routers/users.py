@@ -1,20 +1,33 @@
 from fastapi import APIRouter, Depends, HTTPException, status, Request
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Optional
 
-from API.database import get_db
+from API.database import get_db, run_db, DatabaseRoute
 from API.models.user import User
 from API.schemas.user import UserResponse, UserUpdate, PasswordChange
 from API.auth.dependencies import get_current_user
-from API.auth.password import verify_password, hash_password
+from API.auth.user_cache import AuthenticatedUser
+from API.auth.password import verify_password_async, hash_password_async
 from API.rate_limiter import limiter
+from API.services.changes import record_change, GROUP, USER_GROUP
+from API.services.user_search import index_user, unindex_user, find_users
 
-router = APIRouter(prefix="/users", tags=["Users"])
+router = APIRouter(prefix="/users", tags=["Users"], route_class=DatabaseRoute)
+
+
+def require_user(user: Optional[User]) -> User:
+    """Reject a token whose user was deleted after it was cached."""
+    if user is None:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="User not found"
+        )
+    return user
 
 
 @router.get("/me", response_model=UserResponse)
 @limiter.limit("120/minute")
-def get_my_profile(request: Request, current_user: User = Depends(get_current_user)):
+def get_my_profile(request: Request, current_user: AuthenticatedUser = Depends(get_current_user)):
     """Get current user profile."""
     return current_user
 
@@ -24,44 +37,59 @@ def get_my_profile(request: Request, current_user: User = Depends(get_current_us
 def update_profile(
     request: Request,
     user_data: UserUpdate,
-    current_user: User = Depends(get_current_user),
+    current_user: AuthenticatedUser = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
     """Update current user profile."""
-    current_user.displayName = user_data.displayName
+    user = require_user(db.get(User, current_user.id))
+    user.displayName = user_data.displayName
+    index_user(db, user)
+    
+    # Display names are part of every group's member list
+    for membership in user.groups:
+        record_change(db, membership.groupId, GROUP, membership.groupId)
+    
     db.commit()
-    db.refresh(current_user)
-    return current_user
+    db.refresh(user)
+    return user
 
 
 @router.post("/me/change-password", status_code=status.HTTP_204_NO_CONTENT)
 @limiter.limit("5/minute")
-def change_password(
+async def change_password(
     request: Request,
     password_data: PasswordChange,
-    current_user: User = Depends(get_current_user),
+    current_user: AuthenticatedUser = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
     """Change current user password."""
-    if not verify_password(password_data.oldPassword, current_user.passwordHash):
+    user = require_user(await run_db(db, Session.get, User, current_user.id))
+    
+    if not await verify_password_async(password_data.oldPassword, user.passwordHash):
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Wrong password"
         )
     
-    current_user.passwordHash = hash_password(password_data.newPassword)
-    db.commit()
+    user.passwordHash = await hash_password_async(password_data.newPassword)
+    await run_db(db, Session.commit)
 
 
 @router.delete("/me", status_code=status.HTTP_204_NO_CONTENT)
 @limiter.limit("5/minute")
 def delete_my_account(
     request: Request,
-    current_user: User = Depends(get_current_user),
+    current_user: AuthenticatedUser = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
     """Delete current user account."""
-    db.delete(current_user)
+    user = require_user(db.get(User, current_user.id))
+    
+    for membership in user.groups:
+        record_change(db, membership.groupId, USER_GROUP, user.id)
+    
+    unindex_user(db, user.id)
+    db.delete(user)
     db.commit()
 
 
@@ -70,19 +98,14 @@ def delete_my_account(
 def search_users(
     request: Request,
     query: str,
-    current_user: User = Depends(get_current_user),
+    current_user: AuthenticatedUser = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
-    """Search users by username."""
-    if len(query) < 2:
+    """Search users by username or display name, best matches first."""
+    if len(query.strip()) < 2:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Query must be at least 2 characters"
         )
     
-    users = db.query(User).filter(
-        User.username.contains(query),
-        User.id != current_user.id
-    ).limit(10).all()
-    
-    return users
+    return find_users(db, query, exclude_user_id=current_user.id, limit=10)
@@ -1,5 +1,5 @@
-from pydantic import BaseModel
-from typing import Optional
+from pydantic import BaseModel, Field
+from typing import List, Literal, Optional
 from decimal import Decimal
 
 
@@ -25,3 +25,28 @@ class ShoppingItemResponse(ShoppingItemBase):
     
     class Config:
         from_attributes = True
+
+
+class ShoppingItemOperation(BaseModel):
+    op: Literal["create", "update", "toggle", "delete"]
+    id: Optional[int] = None
+    shoppingListId: Optional[int] = None
+    name: Optional[str] = None
+    quantity: Optional[Decimal] = None
+    unit: Optional[str] = None
+    note: Optional[str] = None
+    checked: Optional[bool] = None
+
+
+class ShoppingItemBatchRequest(BaseModel):
+    operations: List[ShoppingItemOperation] = Field(..., max_length=200)
+
+
+class ShoppingItemOperationResult(BaseModel):
+    status: int
+    item: Optional[ShoppingItemResponse] = None
+    detail: Optional[str] = None
+
+
+class ShoppingItemBatchResponse(BaseModel):
+    results: List[ShoppingItemOperationResult]
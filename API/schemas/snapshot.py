@@ -55,9 +55,19 @@ class ShoppingItemSnapshot(BaseModel):
         from_attributes = True
 
 
+class SnapshotTombstones(BaseModel):
+    """Rows deleted since the cursor. A deleted group or list implies its children."""
+    groups: List[int] = []
+    userGroups: List[UserGroupSnapshot] = []
+    shoppingLists: List[int] = []
+    shoppingItems: List[int] = []
+
+
 class Snapshot(BaseModel):
     user: UserSnapshot
     groups: List[GroupSnapshot]
     userGroups: List[UserGroupSnapshot]
     shoppingLists: List[ShoppingListSnapshot]
     shoppingItems: List[ShoppingItemSnapshot]
+    deleted: Optional[SnapshotTombstones] = None
+    cursor: Optional[str] = None
@@ -0,0 +1,103 @@
+from fastapi import HTTPException, status
+from sqlalchemy import and_
+from sqlalchemy.orm import Session
+from typing import Tuple
+
+from API.models.group import Group
+from API.models.user_group import UserGroup
+from API.models.shopping_list import ShoppingList
+from API.models.shopping_item import ShoppingItem
+
+
+def is_member(user_id: int, group_id: int, db: Session) -> bool:
+    """Check a membership with a primary key lookup."""
+    return db.query(UserGroup.userId).filter(
+        UserGroup.userId == user_id,
+        UserGroup.groupId == group_id
+    ).first() is not None
+
+
+def require_membership(user_id: int, group_id: int, db: Session, forbidden_detail: str = "Not a member of this group"):
+    """Raise 403 unless the user is a member of the group."""
+    if not is_member(user_id, group_id, db):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail=forbidden_detail
+        )
+
+
+def resolve_group(user_id: int, group_id: int, db: Session) -> Group:
+    """Load a group and check the user's membership in a single query."""
+    row = db.query(Group, UserGroup.userId).outerjoin(
+        UserGroup,
+        and_(UserGroup.groupId == Group.id, UserGroup.userId == user_id)
+    ).filter(
+        Group.id == group_id
+    ).first()
+    
+    if row is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Group not found"
+        )
+    
+    group, member_id = row
+    if member_id is None:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Not a member of this group"
+        )
+    
+    return group
+
+
+def resolve_list(user_id: int, list_id: int, db: Session, forbidden_detail: str = "No access to this list") -> ShoppingList:
+    """Load a list and check the user's membership in a single query."""
+    row = db.query(ShoppingList, UserGroup.userId).outerjoin(
+        UserGroup,
+        and_(UserGroup.groupId == ShoppingList.groupId, UserGroup.userId == user_id)
+    ).filter(
+        ShoppingList.id == list_id
+    ).first()
+    
+    if row is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="List not found"
+        )
+    
+    shopping_list, member_id = row
+    if member_id is None:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail=forbidden_detail
+        )
+    
+    return shopping_list
+
+
+def resolve_item(user_id: int, item_id: int, db: Session) -> Tuple[ShoppingItem, int]:
+    """Load an item with its group id and check the user's membership in a single query."""
+    row = db.query(ShoppingItem, ShoppingList.groupId, UserGroup.userId).join(
+        ShoppingList, ShoppingList.id == ShoppingItem.shoppingListId
+    ).outerjoin(
+        UserGroup,
+        and_(UserGroup.groupId == ShoppingList.groupId, UserGroup.userId == user_id)
+    ).filter(
+        ShoppingItem.id == item_id
+    ).first()
+    
+    if row is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Item not found"
+        )
+    
+    item, group_id, member_id = row
+    if member_id is None:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="No access to this list"
+        )
+    
+    return item, group_id
@@ -0,0 +1,138 @@
+from datetime import datetime, timedelta
+from sqlalchemy import delete, event, func, null, select, union_all
+from sqlalchemy.orm import Session
+from typing import Callable, Dict, List, NamedTuple, Optional, Tuple
+
+from API.config import settings
+
+from API.models.change import Change
+from API.models.user_group import UserGroup
+
+# Entity names stored in Changes.entity
+GROUP = "group"
+USER_GROUP = "userGroup"
+SHOPPING_LIST = "shoppingList"
+SHOPPING_ITEM = "shoppingItem"
+
+
+class ChangeEvent(NamedTuple):
+    id: int
+    groupId: int
+    entity: str
+    entityId: int
+
+
+# Called with the list of ChangeEvents after every commit that recorded changes
+commit_listeners: List[Callable[[List[ChangeEvent]], None]] = []
+
+
+def on_commit(listener: Callable[[List[ChangeEvent]], None]):
+    """Register a listener for committed changes."""
+    commit_listeners.append(listener)
+    return listener
+
+
+def record_change(db: Session, group_id: int, entity: str, entity_id: int):
+    """Append a change log entry, committed together with the caller's transaction.
+    
+    For USER_GROUP entries entity_id is the member's user id.
+    """
+    db.add(Change(groupId=group_id, entity=entity, entityId=entity_id))
+
+
+@event.listens_for(Session, "after_flush")
+def collect_changes(session: Session, flush_context):
+    """Remember flushed change log entries until the transaction ends."""
+    for obj in session.new:
+        if isinstance(obj, Change):
+            session.info.setdefault("changes", []).append(
+                ChangeEvent(obj.id, obj.groupId, obj.entity, obj.entityId)
+            )
+
+
+@event.listens_for(Session, "after_commit")
+def dispatch_changes(session: Session):
+    """Notify listeners about committed change log entries."""
+    changes = session.info.pop("changes", None)
+    if not changes:
+        return
+    for listener in commit_listeners:
+        listener(changes)
+
+
+@event.listens_for(Session, "after_rollback")
+def discard_changes(session: Session):
+    """Drop change log entries of a rolled back transaction."""
+    session.info.pop("changes", None)
+
+
+def get_user_versions(db: Session, user_id: int, floor: int = 0) -> Tuple[int, Dict[int, int]]:
+    """Get the user's overall version and the version of each of the user's groups.
+    
+    A group's version is its newest change log entry. The overall version also
+    covers the user's own memberships, so it moves forward when the user leaves
+    a group. Versions are at least floor, pass the id before the oldest kept
+    change so groups whose changes were all pruned keep a valid version.
+    Runs as a single statement.
+    """
+    per_group = select(UserGroup.groupId, func.max(Change.id)).select_from(UserGroup).outerjoin(
+        Change, Change.groupId == UserGroup.groupId
+    ).where(
+        UserGroup.userId == user_id
+    ).group_by(UserGroup.groupId)
+    
+    own_memberships = select(null(), func.max(Change.id)).where(
+        Change.entity == USER_GROUP,
+        Change.entityId == user_id
+    )
+    
+    rows = db.execute(union_all(per_group, own_memberships)).all()
+    
+    group_versions = {group_id: max(version or 0, floor) for group_id, version in rows if group_id is not None}
+    version = max((version or 0 for _, version in rows), default=0)
+    version = max(version, floor)
+    return version, group_versions
+
+
+def get_cursor_bounds(db: Session) -> Tuple[Optional[int], int]:
+    """Get the oldest kept change id and the newest id a cursor may advance to.
+    
+    Ids are allocated on insert but become visible on commit, a transaction
+    holding a lower id can commit after a higher one. Cursors therefore only
+    advance to changes older than change_cursor_safety_seconds, younger
+    changes are sent again with the next delta. Both are read from the ends
+    of the primary key.
+    """
+    cutoff = datetime.utcnow() - timedelta(seconds=settings.change_cursor_safety_seconds)
+    oldest = select(func.min(Change.id)).scalar_subquery()
+    safe = select(Change.id).where(Change.createdAt <= cutoff).order_by(Change.id.desc()).limit(1).scalar_subquery()
+    oldest_id, safe_id = db.execute(select(oldest, safe)).one()
+    return oldest_id, safe_id or 0
+
+
+def version_floor(oldest_id: Optional[int]) -> int:
+    """Smallest version after pruning, every change up to it is gone or older than the oldest kept one."""
+    return oldest_id - 1 if oldest_id is not None else 0
+
+
+def cursor_expired(cursor: int, oldest_id: Optional[int]) -> bool:
+    """Check whether changes after the cursor may have been pruned."""
+    return oldest_id is not None and cursor < oldest_id - 1
+
+
+def prune_changes(db: Session) -> int:
+    """Delete changes older than change_retention_days, returns the number deleted.
+    
+    Deletes below the first entry young enough to keep, so the oldest kept id
+    tells which cursors are expired.
+    """
+    cutoff = datetime.utcnow() - timedelta(days=settings.change_retention_days)
+    first_kept = db.scalar(
+        select(Change.id).where(Change.createdAt >= cutoff).order_by(Change.id).limit(1)
+    )
+    if first_kept is None:
+        return 0
+    
+    deleted = db.execute(delete(Change).where(Change.id < first_kept)).rowcount
+    db.commit()
+    return deleted
@@ -0,0 +1,80 @@
+import asyncio
+import threading
+from typing import List, Optional, Set
+
+from API.config import settings
+from API.services.changes import ChangeEvent, on_commit, USER_GROUP
+
+# Queued instead of a change when a subscriber fell behind
+RESYNC = None
+
+
+class Subscription:
+    """A connected client listening to changes of its groups."""
+    
+    def __init__(self, user_id: int, group_ids: Set[int], loop: asyncio.AbstractEventLoop, queue_size: int):
+        self.user_id = user_id
+        self.group_ids = set(group_ids)
+        self.loop = loop
+        self.queue: "asyncio.Queue[Optional[ChangeEvent]]" = asyncio.Queue(maxsize=queue_size)
+    
+    def select(self, changes: List[ChangeEvent]) -> List[ChangeEvent]:
+        """Pick the changes visible to the subscriber and follow its membership changes."""
+        own_groups = {c.groupId for c in changes if c.entity == USER_GROUP and c.entityId == self.user_id}
+        
+        # The user can only join groups they are not in and leave groups they are in
+        joined = own_groups - self.group_ids
+        left = own_groups & self.group_ids
+        
+        visible = self.group_ids | joined
+        self.group_ids = visible - left
+        return [c for c in changes if c.groupId in visible]
+    
+    def offer(self, change: ChangeEvent):
+        """Queue a change without ever blocking the publisher.
+        
+        A full queue is replaced by a single resync marker, the client then
+        catches up with a delta snapshot instead of stalling everyone else.
+        """
+        try:
+            self.queue.put_nowait(change)
+        except asyncio.QueueFull:
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            self.queue.put_nowait(RESYNC)
+
+
+class EventHub:
+    """In-process pub/sub for committed changes.
+    
+    Only reaches clients connected to the same worker. A shared broker can
+    replace it by providing the same subscribe/unsubscribe/publish methods.
+    """
+    
+    def __init__(self, queue_size: int):
+        self.queue_size = queue_size
+        self._subscriptions: List[Subscription] = []
+        self._lock = threading.Lock()
+    
+    def subscribe(self, user_id: int, group_ids: Set[int], loop: asyncio.AbstractEventLoop) -> Subscription:
+        subscription = Subscription(user_id, group_ids, loop, self.queue_size)
+        with self._lock:
+            self._subscriptions.append(subscription)
+        return subscription
+    
+    def unsubscribe(self, subscription: Subscription):
+        with self._lock:
+            if subscription in self._subscriptions:
+                self._subscriptions.remove(subscription)
+    
+    def publish(self, changes: List[ChangeEvent]):
+        """Fan out changes, safe to call from worker threads."""
+        with self._lock:
+            for subscription in self._subscriptions:
+                for change in subscription.select(changes):
+                    subscription.loop.call_soon_threadsafe(subscription.offer, change)
+
+
+event_hub = EventHub(settings.events_queue_size)
+
+on_commit(event_hub.publish)
@@ -0,0 +1,26 @@
+from collections import defaultdict
+from sqlalchemy.orm import Session
+from typing import Dict, Iterable, List
+
+from API.models.user import User
+from API.models.user_group import UserGroup
+
+
+def get_member_names(group_ids: Iterable[int], db: Session) -> Dict[int, List[str]]:
+    """Get display names of all members for several groups in one query."""
+    group_ids = list(group_ids)
+    members = defaultdict(list)
+    
+    if not group_ids:
+        return members
+    
+    rows = db.query(UserGroup.groupId, User.displayName).join(
+        User, User.id == UserGroup.userId
+    ).filter(
+        UserGroup.groupId.in_(group_ids)
+    ).order_by(UserGroup.groupId, User.id).all()
+    
+    for group_id, display_name in rows:
+        members[group_id].append(display_name)
+    
+    return members
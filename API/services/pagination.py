@@ -0,0 +1,87 @@
+import base64
+import binascii
+import json
+from typing import Optional
+
+from fastapi import HTTPException, status
+from sqlalchemy import and_, literal, or_
+
+# Header carrying the cursor of the next page, missing on the last page
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 500
+
+
+def encode_cursor(sort_key: str, values: list) -> str:
+    """Encode the sort key and the position of the last row as an opaque cursor."""
+    payload = json.dumps([sort_key, values], separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(payload).rstrip(b"=").decode()
+
+
+def decode_cursor(cursor: str, sort_key: str, size: int) -> list:
+    """Decode a cursor, it has to be created with the same sort key."""
+    try:
+        payload = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        cursor_sort_key, values = json.loads(payload)
+    except (binascii.Error, ValueError, TypeError):
+        values = None
+        cursor_sort_key = None
+
+    if (
+        cursor_sort_key != sort_key
+        or not isinstance(values, list)
+        or len(values) != size
+        or not all(isinstance(value, (str, int, float, bool)) for value in values)
+    ):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid cursor"
+        )
+    return values
+
+
+class KeysetPage:
+    """Keyset pagination over columns ending with a unique id.
+
+    Each page continues after the last row of the previous one, so reading a
+    page costs the same no matter how far into the collection it is.
+    """
+
+    def __init__(self, columns: list, descending: bool, sort_key: str, limit: Optional[int], cursor: Optional[str]):
+        self.columns = columns
+        self.descending = descending
+        self.sort_key = sort_key
+        self.limit = limit or DEFAULT_PAGE_SIZE
+        self.after = decode_cursor(cursor, sort_key, len(columns)) if cursor else None
+        self.next_cursor = None
+
+    def apply(self, query):
+        """Filter, order and limit a query to the page, with one extra row to detect the next page."""
+        if self.after is not None:
+            query = query.filter(self.after_condition())
+        order = [column.desc() if self.descending else column.asc() for column in self.columns]
+        return query.order_by(*order).limit(self.limit + 1)
+
+    def after_condition(self):
+        """Rows sorting after the cursor: (a, id) > (x, y) as a OR of ANDs."""
+        # Bound as literals, booleans can not be compared with < and > directly
+        values = [literal(value, column.type) for column, value in zip(self.columns, self.after)]
+        conditions = []
+        for index, column in enumerate(self.columns):
+            compare = column < values[index] if self.descending else column > values[index]
+            equal = [c == v for c, v in zip(self.columns[:index], values[:index])]
+            conditions.append(and_(*equal, compare))
+        return or_(*conditions)
+
+    def trim(self, rows: list) -> list:
+        """Drop the extra row and remember the cursor of the next page."""
+        if len(rows) <= self.limit:
+            return rows
+        rows = rows[:self.limit]
+        last = rows[-1]
+        self.next_cursor = encode_cursor(self.sort_key, [getattr(last, column.key) for column in self.columns])
+        return rows
+
+    def headers(self) -> dict:
+        return {NEXT_CURSOR_HEADER: self.next_cursor} if self.next_cursor else {}
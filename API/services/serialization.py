@@ -0,0 +1,92 @@
+from functools import lru_cache
+from typing import Any, Dict, Iterable, List, Optional
+
+import msgpack
+from fastapi import Request, Response
+from fastapi.responses import JSONResponse, ORJSONResponse
+from pydantic import BaseModel, TypeAdapter
+from typing_extensions import TypedDict
+
+from API.config import settings
+
+MSGPACK_MEDIA_TYPE = "application/msgpack"
+MSGPACK_MEDIA_TYPES = (MSGPACK_MEDIA_TYPE, "application/x-msgpack")
+JSON_MEDIA_TYPES = ("application/json", "application/*", "*/*")
+
+
+@lru_cache(maxsize=None)
+def rows_adapter(schema: type) -> TypeAdapter:
+    """Get the cached adapter serializing a list of plain rows shaped like a response schema.
+
+    The rows are dicts, so nothing is validated and Decimal fields are
+    encoded by pydantic-core the same way the response_model would.
+    """
+    row_type = TypedDict(
+        f"{schema.__name__}Row",
+        {name: field.annotation for name, field in schema.model_fields.items()}
+    )
+    return TypeAdapter(List[row_type])
+
+
+def schema_columns(model, schema: type) -> list:
+    """Get the model columns needed to build a response schema."""
+    return [getattr(model, name) for name in schema.model_fields]
+
+
+def row_dicts(rows: Iterable) -> List[dict]:
+    """Convert query rows (Row tuples or dicts) to dicts."""
+    return [row if isinstance(row, dict) else row._asdict() for row in rows]
+
+
+def rows_response(rows: Iterable, schema: type, headers: Optional[dict] = None) -> Response:
+    """Encode query rows as a JSON array of the schema."""
+    return Response(content=rows_adapter(schema).dump_json(row_dicts(rows)), media_type="application/json", headers=headers)
+
+
+def rows_content(rows: Iterable, schema: type) -> List[dict]:
+    """Convert query rows to JSON compatible dicts of the schema."""
+    return rows_adapter(schema).dump_python(row_dicts(rows), mode="json")
+
+
+def model_response(model: BaseModel, headers: Optional[dict] = None) -> Response:
+    """Encode an already validated model, skipping the response_model pass."""
+    return Response(content=model.model_dump_json(), media_type="application/json", headers=headers)
+
+
+def to_columns(rows: List[dict], schema: type) -> Dict[str, list]:
+    """Convert rows to the columnar layout, one array of values per field."""
+    return {name: [row[name] for row in rows] for name in schema.model_fields}
+
+
+def accepts_msgpack(request: Request) -> bool:
+    """Check if the Accept header prefers MessagePack over JSON."""
+    msgpack_quality = 0.0
+    json_quality = 0.0
+
+    for media_range in request.headers.get("Accept", "").split(","):
+        media_type, *params = [part.strip() for part in media_range.split(";")]
+        quality = 1.0
+        for param in params:
+            if param.startswith("q="):
+                try:
+                    quality = float(param[2:])
+                except ValueError:
+                    quality = 0.0
+
+        if media_type in MSGPACK_MEDIA_TYPES:
+            msgpack_quality = max(msgpack_quality, quality)
+        elif media_type in JSON_MEDIA_TYPES:
+            json_quality = max(json_quality, quality)
+
+    return msgpack_quality > 0 and msgpack_quality >= json_quality
+
+
+def msgpack_response(content: Any, headers: Optional[dict] = None) -> Response:
+    """Encode JSON compatible content as MessagePack."""
+    return Response(content=msgpack.packb(content), media_type=MSGPACK_MEDIA_TYPE, headers=headers)
+
+
+def json_response(content: Any, headers: Optional[dict] = None) -> Response:
+    """Encode JSON compatible content with the configured JSON encoder."""
+    response_class = ORJSONResponse if settings.fast_json else JSONResponse
+    return response_class(content=content, headers=headers)
@@ -0,0 +1,69 @@
+import threading
+from collections import OrderedDict
+from typing import Dict, Iterable, List, NamedTuple, Optional
+
+from API.config import settings
+from API.schemas.snapshot import GroupSnapshot, ShoppingListSnapshot, ShoppingItemSnapshot
+from API.services.changes import on_commit
+
+
+class GroupFragment(NamedTuple):
+    """The part of a snapshot that is identical for all members of a group."""
+    version: int
+    group: GroupSnapshot
+    shoppingLists: List[ShoppingListSnapshot]
+    shoppingItems: List[ShoppingItemSnapshot]
+
+
+class FragmentCache:
+    """Bounded LRU cache of group fragments keyed by group id.
+    
+    Entries are only returned for the version they were built for, so a
+    fragment that another worker made stale is never served.
+    """
+    
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self._entries: "OrderedDict[int, GroupFragment]" = OrderedDict()
+        self._lock = threading.Lock()
+    
+    def get_many(self, versions: Dict[int, int]) -> Dict[int, GroupFragment]:
+        """Get cached fragments that match the given group versions."""
+        found = {}
+        with self._lock:
+            for group_id, version in versions.items():
+                fragment = self._entries.get(group_id)
+                if fragment is not None and fragment.version == version:
+                    self._entries.move_to_end(group_id)
+                    found[group_id] = fragment
+        return found
+    
+    def put(self, group_id: int, fragment: GroupFragment):
+        """Store a fragment, replacing the one of any other version and evicting the least recently used ones.
+        
+        Versions do not only grow, pruning the change log can lower a group's
+        version, so the newest stored fragment wins.
+        """
+        with self._lock:
+            self._entries[group_id] = fragment
+            self._entries.move_to_end(group_id)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+    
+    def invalidate(self, group_ids: Iterable[int]):
+        """Drop fragments of the given groups."""
+        with self._lock:
+            for group_id in group_ids:
+                self._entries.pop(group_id, None)
+    
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+fragment_cache = FragmentCache(settings.snapshot_cache_size)
+
+
+@on_commit
+def invalidate_changed_groups(changes):
+    fragment_cache.invalidate({change.groupId for change in changes})
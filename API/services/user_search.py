@@ -0,0 +1,123 @@
+from typing import Dict, List
+
+from sqlalchemy import and_, delete, func, insert, or_, select
+from sqlalchemy.orm import Session
+
+from API.models.user import User
+from API.models.user_search_term import UserSearchTerm
+
+# Longer suffixes are cut, longer queries are checked against the names
+TERM_LENGTH = 32
+
+# Term rows read per missing result, a user usually matches with few terms of one rank
+OVERFETCH = 4
+
+# Where a term starts in the name
+NAME_START = 0
+WORD_START = 1
+INSIDE = 2
+
+
+def search_terms(username: str, display_name: str) -> Dict[str, int]:
+    """Get every suffix of both names with the best position it starts at."""
+    terms = {}
+    for name in (username, display_name):
+        name = name.lower()
+        for position, char in enumerate(name):
+            if char.isspace():
+                continue
+            if position == 0:
+                start = NAME_START
+            elif not name[position - 1].isalnum():
+                start = WORD_START
+            else:
+                start = INSIDE
+            term = name[position:position + TERM_LENGTH].rstrip()
+            if start < terms.get(term, INSIDE + 1):
+                terms[term] = start
+    return terms
+
+
+def search_term_rows(user_id: int, username: str, display_name: str) -> List[dict]:
+    return [
+        {"term": term, "userId": user_id, "start": start}
+        for term, start in search_terms(username, display_name).items()
+    ]
+
+
+def index_user(db: Session, user: User):
+    """Replace the search terms of a user, call after register and rename."""
+    db.execute(delete(UserSearchTerm).where(UserSearchTerm.userId == user.id))
+    db.execute(insert(UserSearchTerm), search_term_rows(user.id, user.username, user.displayName))
+
+
+def unindex_user(db: Session, user_id: int):
+    """Remove the search terms of a deleted user."""
+    db.execute(delete(UserSearchTerm).where(UserSearchTerm.userId == user_id))
+
+
+def next_prefix(prefix: str) -> str:
+    """Smallest string sorting after every string starting with prefix."""
+    return prefix[:-1] + chr(ord(prefix[-1]) + 1)
+
+
+def find_users(db: Session, query: str, exclude_user_id: int, limit: int = 10) -> List[User]:
+    """Find users whose username or display name contains the query.
+
+    Results are ranked exact match, name prefix, word prefix, substring.
+    Each rank is a range scan on the (start, term, userId) index that stops
+    after a few rows per missing result. A user matching with several terms
+    takes one place of the page, the next batch continues after the last row
+    read if duplicates left places open.
+    """
+    query = query.strip().lower()
+    lookup = query[:TERM_LENGTH]
+    in_range = and_(UserSearchTerm.term >= lookup, UserSearchTerm.term < next_prefix(lookup))
+
+    ranks = [
+        (NAME_START, UserSearchTerm.term == lookup),
+        (NAME_START, in_range),
+        (WORD_START, in_range),
+        (INSIDE, in_range),
+    ]
+
+    user_ids = []
+    for start, term_filter in ranks:
+        rank_query = select(UserSearchTerm.term, UserSearchTerm.userId).where(
+            UserSearchTerm.start == start,
+            term_filter,
+            UserSearchTerm.userId != exclude_user_id,
+            UserSearchTerm.userId.not_in(list(user_ids))
+        ).order_by(UserSearchTerm.term, UserSearchTerm.userId)
+
+        after = None
+        while len(user_ids) < limit:
+            batch_size = (limit - len(user_ids)) * OVERFETCH
+            batch_query = rank_query
+            if after is not None:
+                batch_query = batch_query.where(or_(
+                    UserSearchTerm.term > after[0],
+                    and_(UserSearchTerm.term == after[0], UserSearchTerm.userId > after[1])
+                ))
+            rows = db.execute(batch_query.limit(batch_size)).all()
+
+            for term, user_id in rows:
+                if user_id not in user_ids and len(user_ids) < limit:
+                    user_ids.append(user_id)
+
+            if len(rows) < batch_size:
+                break
+            after = rows[-1]
+
+    if not user_ids:
+        return []
+
+    users = db.query(User).filter(User.id.in_(user_ids))
+    if len(query) > TERM_LENGTH:
+        users = users.filter(or_(
+            func.lower(User.username).contains(query, autoescape=True),
+            func.lower(User.displayName).contains(query, autoescape=True)
+        ))
+
+    position = {user_id: index for index, user_id in enumerate(user_ids)}
+    return sorted(users.all(), key=lambda user: position[user.id])
@@ -0,0 +1,168 @@
+"""Count the SQL statements of each request, opt-in with SQL_PROFILER=true.
+
+Engine events record every statement and its time in the QueryProfile of
+the current request, which is found through a context variable. The
+variable is copied into the threadpool and the async session's greenlet,
+so sync and async endpoints are both covered. Statements that run several
+times with the same shape in one request are reported as likely N+1 queries.
+
+Tests can check a query budget without enabling the profiler:
+
+    with assert_query_budget(5, max_repeats=1):
+        client.get("/snapshot")
+"""
+import logging
+import re
+import time
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Iterator, List, Optional, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from API.database import engine as default_engine, async_engine as default_async_engine
+
+PROFILE_HEADER = "X-SQL-Profile"
+
+logger = logging.getLogger("sharedcart.sql")
+
+# Expanded IN lists, "IN (?, ?, ?)" has the same shape for any number of values
+BIND_LIST = re.compile(r"\(\s*(?:\?|%s|%\(\w+\)s|:\w+)(?:\s*,\s*(?:\?|%s|%\(\w+\)s|:\w+))*\s*\)")
+
+
+def statement_shape(statement: str) -> str:
+    return BIND_LIST.sub("(...)", " ".join(statement.split()))
+
+
+class QueryProfile:
+    """Statements of one request."""
+
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+        self.shapes = Counter()
+
+    def record(self, statement: str, seconds: float):
+        self.count += 1
+        self.seconds += seconds
+        self.shapes[statement_shape(statement)] += 1
+
+    def repeated(self, threshold: int) -> List[Tuple[str, int]]:
+        """Shapes run at least threshold times, most frequent first."""
+        return [(shape, count) for shape, count in self.shapes.most_common() if count >= threshold]
+
+    def header_value(self, threshold: int) -> str:
+        return f"queries={self.count}; time_ms={self.seconds * 1000:.2f}; repeated={len(self.repeated(threshold))}"
+
+
+current_profile: ContextVar[Optional[QueryProfile]] = ContextVar("current_profile", default=None)
+
+
+def listen(engine: Engine, get_profile):
+    """Record the statements of engine in the profile returned by get_profile.
+
+    Returns the listeners, pass them to unlisten to remove them.
+    """
+    # Start times per connection, separate for every listen call
+    start_key = object()
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        if get_profile() is not None:
+            conn.info.setdefault(start_key, []).append(time.perf_counter())
+
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        profile = get_profile()
+        starts = conn.info.get(start_key)
+        if profile is not None and starts:
+            profile.record(statement, time.perf_counter() - starts.pop())
+
+    listeners = [("before_cursor_execute", before_cursor_execute), ("after_cursor_execute", after_cursor_execute)]
+    for name, listener in listeners:
+        event.listen(engine, name, listener)
+    return listeners
+
+
+def unlisten(engine: Engine, listeners):
+    for name, listener in listeners:
+        event.remove(engine, name, listener)
+
+
+class SQLProfilerMiddleware:
+    """Profile the statements of each request.
+
+    The summary is added as the X-SQL-Profile header, statements run after
+    the headers were sent (streamed responses) only show up in the log.
+    """
+
+    def __init__(self, app: ASGIApp, repeat_threshold: int = 3):
+        self.app = app
+        self.repeat_threshold = repeat_threshold
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        profile = QueryProfile()
+        token = current_profile.set(profile)
+
+        async def send_with_profile(message: Message):
+            if message["type"] == "http.response.start":
+                MutableHeaders(scope=message)[PROFILE_HEADER] = profile.header_value(self.repeat_threshold)
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_profile)
+        finally:
+            current_profile.reset(token)
+            self.log(scope, profile)
+
+    def log(self, scope: Scope, profile: QueryProfile):
+        if profile.count == 0:
+            return
+
+        logger.info(f"{scope['method']} {scope['path']}: {profile.count} queries in {profile.seconds * 1000:.2f} ms")
+        for shape, count in profile.repeated(self.repeat_threshold):
+            logger.warning(f"Possible N+1 in {scope['method']} {scope['path']}: {count}x {shape}")
+
+
+def profile_engines(engines: List[Engine]):
+    """Record the statements of the engines in the current request's profile."""
+    for engine in engines:
+        listen(engine, current_profile.get)
+
+
+@contextmanager
+def count_queries(engines: List[Engine] = None) -> Iterator[QueryProfile]:
+    """Record every statement run inside the block, from any thread."""
+    if engines is None:
+        engines = [default_engine]
+        if default_async_engine is not None:
+            engines.append(default_async_engine.sync_engine)
+
+    profile = QueryProfile()
+    registered = [(engine, listen(engine, lambda: profile)) for engine in engines]
+    try:
+        yield profile
+    finally:
+        for engine, listeners in registered:
+            unlisten(engine, listeners)
+
+
+@contextmanager
+def assert_query_budget(max_queries: int, max_repeats: int = None, engines: List[Engine] = None) -> Iterator[QueryProfile]:
+    """Fail with AssertionError when the block runs more than max_queries statements,
+    or one statement shape more than max_repeats times. For tests.
+    """
+    with count_queries(engines) as profile:
+        yield profile
+
+    statements = "\n".join(f"  {count}x {shape}" for shape, count in profile.shapes.most_common())
+    assert profile.count <= max_queries, f"{profile.count} queries, budget is {max_queries}:\n{statements}"
+    if max_repeats is not None:
+        repeated = profile.repeated(max_repeats + 1)
+        assert not repeated, f"Statements repeated more than {max_repeats} times (N+1?):\n{statements}"
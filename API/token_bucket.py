@@ -0,0 +1,230 @@
+"""Token bucket rate limiting for slowapi.
+
+A limit of N per period is a bucket holding up to N tokens that refills at
+N / period tokens per second, every request takes one token. A bucket is
+two numbers per key, updated in place, so a check allocates nothing.
+
+Importing this module registers the "token-bucket" strategy and the
+"bucket-memory://" (per process) and "bucket-sqlite://" (shared by all
+workers on the host) storages with the limits library used by slowapi.
+"""
+import os
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from typing import Dict, List
+
+from limits.errors import ConfigurationError
+from limits.limits import RateLimitItem
+from limits.storage import Storage
+from limits.strategies import STRATEGIES, RateLimiter
+from limits.util import WindowStats
+
+# Full buckets behave like missing ones and are dropped every PURGE_INTERVAL checks
+PURGE_INTERVAL = 1000
+
+
+class TokenBucketStorage(Storage, ABC):
+    """Base class of the storages usable with the token-bucket strategy."""
+
+    @abstractmethod
+    def acquire(self, key: str, capacity: float, rate: float, cost: int) -> bool:
+        """Take cost tokens from a bucket if it holds enough, atomically."""
+
+    @abstractmethod
+    def peek(self, key: str, capacity: float, rate: float) -> float:
+        """Get the tokens in a bucket without taking any."""
+
+    # Window counters of the other strategies are not supported, configuring one is an error
+
+    def incr(self, key: str, expiry: int, amount: int = 1) -> int:
+        raise ConfigurationError("Only the token-bucket strategy is supported by bucket storages")
+
+    def get(self, key: str) -> int:
+        raise ConfigurationError("Only the token-bucket strategy is supported by bucket storages")
+
+    def get_expiry(self, key: str) -> float:
+        raise ConfigurationError("Only the token-bucket strategy is supported by bucket storages")
+
+
+class MemoryTokenBucketStorage(TokenBucketStorage):
+    """Buckets of this process."""
+
+    STORAGE_SCHEME = ["bucket-memory"]
+
+    def __init__(self, uri: str = None, wrap_exceptions: bool = False, **options):
+        self._buckets: Dict[str, List[float]] = {}
+        self._lock = threading.Lock()
+        self._checks = 0
+        super().__init__(uri, wrap_exceptions=wrap_exceptions, **options)
+
+    @property
+    def base_exceptions(self):
+        return ValueError
+
+    def acquire(self, key: str, capacity: float, rate: float, cost: int) -> bool:
+        now = time.time()
+        with self._lock:
+            self._checks += 1
+            if self._checks % PURGE_INTERVAL == 0:
+                self._purge(now)
+
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                # [tokens, updated, full at]
+                bucket = self._buckets[key] = [capacity, now, now]
+
+            tokens = min(capacity, bucket[0] + (now - bucket[1]) * rate)
+            allowed = tokens >= cost
+            if allowed:
+                tokens -= cost
+            bucket[0] = tokens
+            bucket[1] = now
+            bucket[2] = now + (capacity - tokens) / rate
+            return allowed
+
+    def peek(self, key: str, capacity: float, rate: float) -> float:
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                return capacity
+            return min(capacity, bucket[0] + (time.time() - bucket[1]) * rate)
+
+    def _purge(self, now: float):
+        for key in [key for key, bucket in self._buckets.items() if bucket[2] <= now]:
+            del self._buckets[key]
+
+    def check(self) -> bool:
+        return True
+
+    def reset(self) -> int:
+        with self._lock:
+            count = len(self._buckets)
+            self._buckets.clear()
+            return count
+
+    def clear(self, key: str):
+        with self._lock:
+            self._buckets.pop(key, None)
+
+
+# Tokens after refilling since the last update, the SET clause sees the old row
+REFILLED = "min(:capacity, tokens + (:now - updated) * :rate)"
+
+ACQUIRE_SQL = f"""
+    INSERT INTO buckets (key, tokens, updated, allowed, full_at)
+    VALUES (:key, :capacity - :cost, :now, 1, :now + :cost / :rate)
+    ON CONFLICT (key) DO UPDATE SET
+        tokens = {REFILLED} - CASE WHEN {REFILLED} >= :cost THEN :cost ELSE 0 END,
+        allowed = {REFILLED} >= :cost,
+        full_at = :now + (:capacity - {REFILLED} + CASE WHEN {REFILLED} >= :cost THEN :cost ELSE 0 END) / :rate,
+        updated = :now
+    RETURNING allowed
+"""
+
+
+class SQLiteTokenBucketStorage(TokenBucketStorage):
+    """Buckets in a SQLite file (WAL) shared by all workers on one host.
+
+    Every check is a single upsert, SQLite runs it under its write lock so
+    concurrent workers never lose an update.
+    """
+
+    STORAGE_SCHEME = ["bucket-sqlite"]
+
+    def __init__(self, uri: str = None, wrap_exceptions: bool = False, path: str = "rate_limits.sqlite3", **options):
+        self.path = path
+        self._connection = None
+        self._pid = None
+        self._lock = threading.Lock()
+        self._checks = 0
+        super().__init__(uri, wrap_exceptions=wrap_exceptions, **options)
+
+    @property
+    def base_exceptions(self):
+        return sqlite3.Error
+
+    def _connect(self) -> sqlite3.Connection:
+        # Connections must not be shared with forked worker processes
+        if self._connection is None or self._pid != os.getpid():
+            connection = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None, timeout=5)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS buckets ("
+                "key TEXT PRIMARY KEY, tokens REAL NOT NULL, updated REAL NOT NULL, "
+                "allowed INTEGER NOT NULL, full_at REAL NOT NULL) WITHOUT ROWID"
+            )
+            connection.execute("CREATE INDEX IF NOT EXISTS ix_buckets_full_at ON buckets (full_at)")
+            self._connection = connection
+            self._pid = os.getpid()
+        return self._connection
+
+    def acquire(self, key: str, capacity: float, rate: float, cost: int) -> bool:
+        now = time.time()
+        with self._lock:
+            connection = self._connect()
+            self._checks += 1
+            if self._checks % PURGE_INTERVAL == 0:
+                connection.execute("DELETE FROM buckets WHERE full_at <= ?", (now,))
+            row = connection.execute(
+                ACQUIRE_SQL, {"key": key, "capacity": capacity, "rate": rate, "cost": cost, "now": now}
+            ).fetchone()
+        return bool(row[0])
+
+    def peek(self, key: str, capacity: float, rate: float) -> float:
+        now = time.time()
+        with self._lock:
+            row = self._connect().execute("SELECT tokens, updated FROM buckets WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return capacity
+        return min(capacity, row[0] + (now - row[1]) * rate)
+
+    def check(self) -> bool:
+        try:
+            with self._lock:
+                self._connect().execute("SELECT 1")
+            return True
+        except sqlite3.Error:
+            return False
+
+    def reset(self) -> int:
+        with self._lock:
+            return self._connect().execute("DELETE FROM buckets").rowcount
+
+    def clear(self, key: str):
+        with self._lock:
+            self._connect().execute("DELETE FROM buckets WHERE key = ?", (key,))
+
+
+class TokenBucketRateLimiter(RateLimiter):
+    """Strategy taking one token per hit from the bucket of a limit."""
+
+    def __init__(self, storage: TokenBucketStorage):
+        if not isinstance(storage, TokenBucketStorage):
+            raise ConfigurationError("The token-bucket strategy needs a bucket-memory:// or bucket-sqlite:// storage")
+        super().__init__(storage)
+
+    @staticmethod
+    def bucket(item: RateLimitItem):
+        """Capacity and refill rate (tokens per second) of a limit."""
+        return item.amount, item.amount / item.get_expiry()
+
+    def hit(self, item: RateLimitItem, *identifiers: str, cost: int = 1) -> bool:
+        capacity, rate = self.bucket(item)
+        return self.storage.acquire(item.key_for(*identifiers), capacity, rate, cost)
+
+    def test(self, item: RateLimitItem, *identifiers: str, cost: int = 1) -> bool:
+        capacity, rate = self.bucket(item)
+        return self.storage.peek(item.key_for(*identifiers), capacity, rate) >= cost
+
+    def get_window_stats(self, item: RateLimitItem, *identifiers: str) -> WindowStats:
+        """Remaining whole tokens, reset is when the next token is available or the bucket is full."""
+        capacity, rate = self.bucket(item)
+        tokens = self.storage.peek(item.key_for(*identifiers), capacity, rate)
+        missing = 1 - tokens if tokens < 1 else capacity - tokens
+        return WindowStats(time.time() + missing / rate, int(tokens))
+
+
+STRATEGIES["token-bucket"] = TokenBucketRateLimiter
@@ -0,0 +1,3 @@
+# Seeded users are called bench000000, bench000001, ... and share one password
+USERNAME_PREFIX = "bench"
+PASSWORD = "benchmark"
@@ -0,0 +1,203 @@
+"""Replay client traffic against a running server and report latency per endpoint.
+
+Usage:
+    python -m benchmarks.seed --users 1000
+    RATE_LIMIT_ENABLED=false uvicorn API.main:app --workers 2
+    python -m benchmarks.load --url http://localhost:8000 --duration 60 --output run.json
+    python -m benchmarks.report run.json --baseline before.json
+
+Scenarios, each with its own number of virtual users:
+    snapshot   poll /snapshot with If-None-Match, like the app in the foreground
+    toggle     idle, then a burst of check / uncheck of items, like shopping in a store
+    login      all login users log in at the same moment, every --storm-interval seconds
+    join       join a group of other users by invite code and leave it again
+
+The virtual users are the seeded bench users. Every virtual user follows its
+own random stream (--seed), so runs against the same seeded database replay
+the same traffic. Turn off the rate limiter on the server, otherwise most
+requests of one host are answered with 429.
+"""
+import argparse
+import asyncio
+import random
+import time
+from typing import List, Optional
+
+import httpx
+
+from benchmarks import PASSWORD, USERNAME_PREFIX
+from benchmarks.report import Recorder, load, print_report, save, summarize
+
+
+class VirtualUser:
+    """A seeded user with its token and the ids it can work on."""
+
+    def __init__(self, username: str, rng: random.Random):
+        self.username = username
+        self.rng = rng
+        self.headers = {}
+        self.group_ids = set()
+        self.item_ids: List[int] = []
+
+
+async def send(client: httpx.AsyncClient, recorder: Recorder, endpoint: str, method: str, url: str,
+               **kwargs) -> Optional[httpx.Response]:
+    """Send one request and record it under endpoint, e.g. "GET /snapshot"."""
+    start = time.perf_counter()
+    try:
+        response = await client.request(method, url, **kwargs)
+    except httpx.HTTPError:
+        recorder.record(endpoint, 0, time.perf_counter() - start)
+        return None
+    recorder.record(endpoint, response.status_code, time.perf_counter() - start)
+    return response
+
+
+async def log_in(client: httpx.AsyncClient, user: VirtualUser, password: str, semaphore: asyncio.Semaphore):
+    """Log in for the run, retrying while the password hashing pool is busy."""
+    for attempt in range(20):
+        async with semaphore:
+            response = await client.post("/auth/login", json={"username": user.username, "password": password})
+        if response.status_code == 200:
+            user.headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+            return
+        if response.status_code not in (429, 503):
+            raise RuntimeError(f"Login of {user.username} failed: {response.status_code} {response.text}")
+        await asyncio.sleep(0.5 * (attempt + 1))
+    raise RuntimeError(f"Login of {user.username} kept failing, is the rate limiter off?")
+
+
+async def load_state(client: httpx.AsyncClient, user: VirtualUser, invite_codes: dict):
+    """Learn the groups and items of a user from its snapshot."""
+    response = await client.get("/snapshot", headers=user.headers)
+    response.raise_for_status()
+    snapshot = response.json()
+    user.group_ids = {group["id"] for group in snapshot["groups"]}
+    user.item_ids = [item["id"] for item in snapshot["shoppingItems"]]
+    for group in snapshot["groups"]:
+        if group.get("inviteCode"):
+            invite_codes[group["id"]] = group["inviteCode"]
+
+
+async def pause(seconds: float, deadline: float):
+    """Sleep, but not past the end of the run."""
+    await asyncio.sleep(max(0.0, min(seconds, deadline - time.monotonic())))
+
+
+async def poll_snapshots(client, recorder, user: VirtualUser, deadline: float, args):
+    etag = None
+    while time.monotonic() < deadline:
+        headers = dict(user.headers)
+        if etag:
+            headers["If-None-Match"] = etag
+        response = await send(client, recorder, "GET /snapshot", "GET", "/snapshot", headers=headers)
+        if response is not None and response.status_code == 200:
+            etag = response.headers.get("ETag")
+        await pause(args.poll_interval * user.rng.uniform(0.5, 1.5), deadline)
+
+
+async def toggle_items(client, recorder, user: VirtualUser, deadline: float, args):
+    if not user.item_ids:
+        return
+    while time.monotonic() < deadline:
+        await pause(user.rng.expovariate(1 / args.burst_idle), deadline)
+        for _ in range(user.rng.randint(3, args.burst_size)):
+            if time.monotonic() >= deadline:
+                return
+            item_id = user.rng.choice(user.item_ids)
+            await send(client, recorder, "PATCH /items/{item_id}/check", "PATCH", f"/items/{item_id}/check",
+                       headers=user.headers)
+            await asyncio.sleep(user.rng.uniform(0.05, 0.3))
+
+
+async def login_storms(client, recorder, users: List[VirtualUser], deadline: float, args):
+    while time.monotonic() < deadline:
+        await asyncio.gather(*(
+            send(client, recorder, "POST /auth/login", "POST", "/auth/login",
+                 json={"username": user.username, "password": args.password})
+            for user in users
+        ))
+        await pause(args.storm_interval, deadline)
+
+
+async def join_groups(client, recorder, user: VirtualUser, deadline: float, invite_codes: dict, args):
+    candidates = [group_id for group_id in invite_codes if group_id not in user.group_ids]
+    if not candidates:
+        return
+    while time.monotonic() < deadline:
+        group_id = user.rng.choice(candidates)
+        response = await send(client, recorder, "POST /groups/join", "POST", "/groups/join",
+                              json={"inviteCode": invite_codes[group_id]}, headers=user.headers)
+        if response is not None and response.status_code == 200:
+            await send(client, recorder, "POST /groups/{group_id}/leave", "POST", f"/groups/{group_id}/leave",
+                       headers=user.headers)
+        await pause(args.join_interval * user.rng.uniform(0.5, 1.5), deadline)
+
+
+async def run(args) -> dict:
+    users_needed = max(args.snapshot_users, args.toggle_users, args.login_users, args.join_users)
+    users = [
+        VirtualUser(f"{args.prefix}{i:06d}", random.Random(args.seed * 100003 + i))
+        for i in range(users_needed)
+    ]
+
+    limits = httpx.Limits(max_connections=args.connections, max_keepalive_connections=args.connections)
+    async with httpx.AsyncClient(base_url=args.url, limits=limits, timeout=args.timeout,
+                                 verify=not args.insecure) as client:
+        print(f"Logging in {len(users)} users")
+        semaphore = asyncio.Semaphore(args.setup_concurrency)
+        await asyncio.gather(*(log_in(client, user, args.password, semaphore) for user in users))
+        invite_codes = {}
+        for user in users:
+            await load_state(client, user, invite_codes)
+
+        recorder = Recorder()
+        start = time.monotonic()
+        deadline = start + args.duration
+        print(f"Running for {args.duration} s")
+        scenarios = [
+            *(poll_snapshots(client, recorder, user, deadline, args) for user in users[:args.snapshot_users]),
+            *(toggle_items(client, recorder, user, deadline, args) for user in users[:args.toggle_users]),
+            *(join_groups(client, recorder, user, deadline, invite_codes, args) for user in users[:args.join_users]),
+        ]
+        if args.login_users:
+            scenarios.append(login_storms(client, recorder, users[:args.login_users], deadline, args))
+        await asyncio.gather(*scenarios)
+        duration = time.monotonic() - start
+
+    config = {name: value for name, value in vars(args).items() if name not in ("output", "baseline", "password")}
+    return summarize(recorder, duration, config)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--url", default="http://localhost:8000")
+    parser.add_argument("--duration", type=float, default=60)
+    parser.add_argument("--snapshot-users", type=int, default=50)
+    parser.add_argument("--toggle-users", type=int, default=20)
+    parser.add_argument("--login-users", type=int, default=10)
+    parser.add_argument("--join-users", type=int, default=5)
+    parser.add_argument("--poll-interval", type=float, default=2.0, help="Seconds between snapshot polls")
+    parser.add_argument("--burst-idle", type=float, default=5.0, help="Mean seconds between toggle bursts")
+    parser.add_argument("--burst-size", type=int, default=15, help="Most toggles in one burst")
+    parser.add_argument("--storm-interval", type=float, default=15.0, help="Seconds between login storms")
+    parser.add_argument("--join-interval", type=float, default=3.0, help="Seconds between joins of a user")
+    parser.add_argument("--connections", type=int, default=100)
+    parser.add_argument("--timeout", type=float, default=30.0)
+    parser.add_argument("--setup-concurrency", type=int, default=2, help="Parallel logins before the run")
+    parser.add_argument("--insecure", action="store_true", help="Accept the self-signed certificate")
+    parser.add_argument("--prefix", default=USERNAME_PREFIX, help="Username prefix of the seeded users")
+    parser.add_argument("--password", default=PASSWORD)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--output", help="Save the results as JSON")
+    parser.add_argument("--baseline", help="Results of an earlier run to compare with")
+    args = parser.parse_args()
+
+    summary = asyncio.run(run(args))
+    print_report(summary, load(args.baseline) if args.baseline else None)
+    if args.output:
+        save(summary, args.output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,146 @@
+"""Throughput and latency percentiles per endpoint of a load test run.
+
+Usage:
+    python -m benchmarks.report results.json
+    python -m benchmarks.report results.json --baseline before.json
+
+Results are saved as JSON by benchmarks.load --output, comparing with a
+baseline prints the change of throughput and p95 for every endpoint.
+"""
+import argparse
+import json
+import math
+import os
+import subprocess
+import time
+from collections import Counter, defaultdict
+from typing import Dict, List, Optional
+
+
+class Recorder:
+    """Latency and status of every request, by endpoint."""
+
+    def __init__(self):
+        self.latencies: Dict[str, List[float]] = defaultdict(list)
+        self.statuses: Dict[str, Counter] = defaultdict(Counter)
+        self.started = time.time()
+
+    def record(self, endpoint: str, status_code: int, seconds: float):
+        """status_code is 0 when no response was received."""
+        self.statuses[endpoint][status_code] += 1
+        if 200 <= status_code < 400:
+            self.latencies[endpoint].append(seconds)
+
+
+def percentile(values: List[float], percent: float) -> float:
+    """Nearest-rank percentile of sorted values."""
+    if not values:
+        return 0.0
+    rank = max(1, math.ceil(percent / 100 * len(values)))
+    return values[rank - 1]
+
+
+def endpoint_summary(latencies: List[float], statuses: Counter, duration: float) -> dict:
+    latencies = sorted(latencies)
+    requests = sum(statuses.values())
+    return {
+        "requests": requests,
+        "errors": requests - len(latencies),
+        "throughput": len(latencies) / duration,
+        "p50_ms": percentile(latencies, 50) * 1000,
+        "p95_ms": percentile(latencies, 95) * 1000,
+        "p99_ms": percentile(latencies, 99) * 1000,
+        "max_ms": (latencies[-1] if latencies else 0.0) * 1000,
+        "statuses": {str(code): count for code, count in sorted(statuses.items())},
+    }
+
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True,
+            cwd=os.path.dirname(os.path.abspath(__file__))
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def summarize(recorder: Recorder, duration: float, config: dict) -> dict:
+    """Summary of a run, latencies count successful (2xx/3xx) responses only."""
+    endpoints = {
+        endpoint: endpoint_summary(recorder.latencies[endpoint], statuses, duration)
+        for endpoint, statuses in sorted(recorder.statuses.items())
+    }
+
+    all_statuses = Counter()
+    all_latencies = []
+    for endpoint, statuses in recorder.statuses.items():
+        all_statuses.update(statuses)
+        all_latencies.extend(recorder.latencies[endpoint])
+
+    return {
+        "started": time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(recorder.started)),
+        "commit": git_commit(),
+        "duration": duration,
+        "config": config,
+        "endpoints": endpoints,
+        "total": endpoint_summary(all_latencies, all_statuses, duration),
+    }
+
+
+def change(value: float, before: float) -> str:
+    if not before:
+        return "-"
+    return f"{(value - before) / before * 100:+.0f}%"
+
+
+def print_report(summary: dict, baseline: dict = None):
+    print(f"Run {summary['started']}, commit {summary['commit'] or 'unknown'}, {summary['duration']:.0f} s")
+    header = f"{'endpoint':<30} {'requests':>9} {'errors':>7} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'max ms':>8}"
+    if baseline:
+        header += f" {'req/s':>7} {'p95':>7}"
+    print(header)
+
+    rows = list(summary["endpoints"].items()) + [("total", summary["total"])]
+    for endpoint, result in rows:
+        line = (
+            f"{endpoint:<30} {result['requests']:>9} {result['errors']:>7} {result['throughput']:>8.1f} "
+            f"{result['p50_ms']:>8.1f} {result['p95_ms']:>8.1f} {result['p99_ms']:>8.1f} {result['max_ms']:>8.1f}"
+        )
+        if baseline:
+            before = baseline["total"] if endpoint == "total" else baseline["endpoints"].get(endpoint)
+            if before:
+                line += f" {change(result['throughput'], before['throughput']):>7} {change(result['p95_ms'], before['p95_ms']):>7}"
+        print(line)
+
+    errors = {
+        endpoint: {code: count for code, count in result["statuses"].items() if not 200 <= int(code) < 400}
+        for endpoint, result in summary["endpoints"].items()
+    }
+    for endpoint, codes in errors.items():
+        if codes:
+            details = ", ".join(f"{'no response' if code == '0' else code}: {count}" for code, count in codes.items())
+            print(f"  {endpoint} errors: {details}")
+
+
+def save(summary: dict, path: str):
+    with open(path, "w") as file:
+        json.dump(summary, file, indent=2)
+
+
+def load(path: str) -> dict:
+    with open(path) as file:
+        return json.load(file)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("results")
+    parser.add_argument("--baseline", help="Results of an earlier run to compare with")
+    args = parser.parse_args()
+
+    print_report(load(args.results), load(args.baseline) if args.baseline else None)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+"""Compare the default response_model encoding with the fast_json path.
+
+Usage:
+    python -m benchmarks.serialization --items 20 200 2000
+
+Rows are loaded once from an in-memory SQLite database, only the encoding
+of one response is timed.
+"""
+import argparse
+import asyncio
+import json
+import os
+import timeit
+from decimal import Decimal
+from typing import List
+
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+os.environ.setdefault("JWT_SECRET_KEY", "benchmark")
+
+from fastapi.responses import JSONResponse, ORJSONResponse
+from fastapi.routing import serialize_response
+from fastapi.utils import create_model_field
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+
+from API.database import Base
+import API.models  # noqa: F401 - registers all tables on Base
+from API.models.shopping_list import ShoppingList
+from API.models.shopping_item import ShoppingItem
+from API.schemas.shopping_item import ShoppingItemResponse
+from API.services.serialization import rows_response, schema_columns
+
+
+def seed(db: Session, count: int):
+    """Create one list with count items."""
+    shopping_list = ShoppingList(id=1, groupId=1, name="Benchmark")
+    db.add(shopping_list)
+    db.add_all(
+        ShoppingItem(
+            id=i + 1,
+            shoppingListId=1,
+            name=f"Item {i}",
+            quantity=Decimal(i % 7) + Decimal("0.25"),
+            unit="kg" if i % 3 else None,
+            note="Bio" if i % 5 == 0 else None,
+            checked=i % 2 == 0
+        )
+        for i in range(count)
+    )
+    db.commit()
+
+
+def measure(func, repeat: int) -> float:
+    """Best time of one call in microseconds."""
+    number = max(1, repeat)
+    return min(timeit.repeat(func, number=number, repeat=5)) / number * 1e6
+
+
+def run(count: int, repeat: int):
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(bind=engine)
+
+    with Session(engine) as db:
+        seed(db, count)
+        items = db.query(ShoppingItem).all()
+        rows = db.query(ShoppingItem).with_entities(*schema_columns(ShoppingItem, ShoppingItemResponse)).all()
+
+    field = create_model_field(name="Response", type_=List[ShoppingItemResponse], mode="serialization")
+    loop = asyncio.new_event_loop()
+
+    def default_path():
+        content = loop.run_until_complete(serialize_response(field=field, response_content=items))
+        return JSONResponse(content).body
+
+    def orjson_path():
+        content = loop.run_until_complete(serialize_response(field=field, response_content=items))
+        return ORJSONResponse(content).body
+
+    def fast_path():
+        return rows_response(rows, ShoppingItemResponse).body
+
+    # Both paths have to produce the same document
+    assert json.loads(fast_path()) == json.loads(default_path())
+
+    results = {
+        "response_model + json": measure(default_path, repeat),
+        "response_model + orjson": measure(orjson_path, repeat),
+        "fast_json rows": measure(fast_path, repeat),
+    }
+    loop.close()
+
+    baseline = results["response_model + json"]
+    print(f"{count} items")
+    for name, micros in results.items():
+        print(f"  {name:<26} {micros:10.1f} us  {baseline / micros:5.1f}x")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--items", type=int, nargs="+", default=[20, 200, 2000])
+    parser.add_argument("--repeat", type=int, default=0, help="Calls per measurement, default depends on size")
+    args = parser.parse_args()
+
+    for count in args.items:
+        run(count, args.repeat or max(1, 20000 // count))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,23 @@
+"""Settings for the tests, set before the first test module imports API."""
+import os
+import tempfile
+
+TEST_DIRECTORY = tempfile.mkdtemp()
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{os.path.join(TEST_DIRECTORY, 'test.db')}")
+os.environ.setdefault("LOG_FILE", os.path.join(TEST_DIRECTORY, "api.log"))
+os.environ.setdefault("JWT_SECRET_KEY", "test-secret-key-with-at-least-32-bytes")
+os.environ.setdefault("RATE_LIMIT_ENABLED", "false")
+# Cursors advance to the newest change, deltas only see the changes a test made
+os.environ.setdefault("CHANGE_CURSOR_SAFETY_SECONDS", "0")
+
+import pytest
+from fastapi.testclient import TestClient
+
+from API.main import app
+
+
+@pytest.fixture(scope="session")
+def client():
+    """The app with its startup done, shared by all tests. Modules add their own users."""
+    with TestClient(app) as client:
+        yield client
@@ -0,0 +1,137 @@
+"""Keyset pagination of GET /items/list/{list_id} and GET /lists."""
+import pytest
+
+from API.auth.jwt_handler import create_access_token
+from API.database import SessionLocal
+from API.models import User, Group, UserGroup, ShoppingList, ShoppingItem
+from API.services.pagination import NEXT_CURSOR_HEADER
+
+USER_ID = 11
+GROUP_ID = 1100
+LIST_ID = 11000
+
+# Names with ties, checked alternates so both values are split across pages
+ITEM_NAMES = ["milk", "bread", "eggs", "bread", "apples", "bread", "milk"]
+
+
+@pytest.fixture(scope="module", autouse=True)
+def shopping_list(client):
+    db = SessionLocal()
+    db.add(User(id=USER_ID, username="paula", displayName="Paula", passwordHash="-"))
+    db.add(Group(id=GROUP_ID, name="Pages", inviteCode="PAGES110"))
+    db.add(UserGroup(userId=USER_ID, groupId=GROUP_ID))
+    for list_number in range(5):
+        db.add(ShoppingList(id=LIST_ID + list_number, groupId=GROUP_ID, name=f"List {list_number}"))
+    for index, name in enumerate(ITEM_NAMES):
+        db.add(ShoppingItem(id=LIST_ID * 10 + index, shoppingListId=LIST_ID, name=name, checked=index % 2 == 1))
+    db.commit()
+    db.close()
+
+
+@pytest.fixture
+def headers():
+    return {"Authorization": f"Bearer {create_access_token(USER_ID)}"}
+
+
+def fetch_pages(client, url: str, headers: dict, **params) -> list:
+    """Follow the next cursors, returns the pages."""
+    pages = []
+    while True:
+        response = client.get(url, params=params, headers=headers)
+        assert response.status_code == 200
+        pages.append(response.json())
+        params["cursor"] = response.headers.get(NEXT_CURSOR_HEADER)
+        if params["cursor"] is None:
+            return pages
+
+
+def expected_order(key, descending: bool = False, checked=None) -> list:
+    items = [
+        {"id": LIST_ID * 10 + index, "name": name, "checked": index % 2 == 1}
+        for index, name in enumerate(ITEM_NAMES)
+    ]
+    if checked is not None:
+        items = [item for item in items if item["checked"] == checked]
+    return [item["id"] for item in sorted(items, key=lambda item: (key(item), item["id"]), reverse=descending)]
+
+
+@pytest.mark.parametrize("sort_by, sort_order, checked, key", [
+    (None, "asc", None, lambda item: 0),
+    ("name", "asc", None, lambda item: item["name"]),
+    ("name", "desc", None, lambda item: item["name"]),
+    ("checked", "asc", None, lambda item: item["checked"]),
+    ("checked", "desc", None, lambda item: item["checked"]),
+    ("name", "asc", False, lambda item: item["name"]),
+])
+def test_pages_return_every_item_once_in_order(client, headers, sort_by, sort_order, checked, key):
+    params = {"limit": 2, "sort_order": sort_order}
+    if sort_by is not None:
+        params["sort_by"] = sort_by
+    if checked is not None:
+        params["checked"] = checked
+
+    pages = fetch_pages(client, f"/items/list/{LIST_ID}", headers, **params)
+
+    assert all(len(page) <= 2 for page in pages)
+    ids = [item["id"] for page in pages for item in page]
+    assert ids == expected_order(key, sort_order == "desc", checked)
+
+
+def test_page_continues_inside_ties(client, headers):
+    first = client.get(f"/items/list/{LIST_ID}", params={"limit": 2, "sort_by": "name"}, headers=headers)
+    assert [item["name"] for item in first.json()] == ["apples", "bread"]
+
+    second = client.get(
+        f"/items/list/{LIST_ID}",
+        params={"limit": 2, "sort_by": "name", "cursor": first.headers[NEXT_CURSOR_HEADER]},
+        headers=headers
+    )
+    assert [item["name"] for item in second.json()] == ["bread", "bread"]
+    assert second.json()[0]["id"] > first.json()[1]["id"]
+
+
+def test_last_page_has_no_next_cursor(client, headers):
+    exact = client.get(f"/items/list/{LIST_ID}", params={"limit": len(ITEM_NAMES)}, headers=headers)
+    assert len(exact.json()) == len(ITEM_NAMES)
+    assert NEXT_CURSOR_HEADER not in exact.headers
+
+    short = client.get(f"/items/list/{LIST_ID}", params={"limit": len(ITEM_NAMES) - 1}, headers=headers)
+    rest = client.get(
+        f"/items/list/{LIST_ID}",
+        params={"limit": len(ITEM_NAMES) - 1, "cursor": short.headers[NEXT_CURSOR_HEADER]},
+        headers=headers
+    )
+    assert len(rest.json()) == 1
+    assert NEXT_CURSOR_HEADER not in rest.headers
+
+
+def test_without_limit_every_item_is_returned(client, headers):
+    response = client.get(f"/items/list/{LIST_ID}", headers=headers)
+    assert len(response.json()) == len(ITEM_NAMES)
+    assert NEXT_CURSOR_HEADER not in response.headers
+
+
+@pytest.mark.parametrize("cursor", ["not-a-cursor", "WyJuYW1lOmFzYyIsWzFdXQ", "e30"])
+def test_invalid_cursor_is_rejected(client, headers, cursor):
+    response = client.get(
+        f"/items/list/{LIST_ID}", params={"limit": 2, "sort_by": "name", "cursor": cursor}, headers=headers
+    )
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Invalid cursor"
+
+
+def test_cursor_of_another_sort_order_is_rejected(client, headers):
+    first = client.get(f"/items/list/{LIST_ID}", params={"limit": 2, "sort_by": "name"}, headers=headers)
+    response = client.get(
+        f"/items/list/{LIST_ID}",
+        params={"limit": 2, "sort_by": "checked", "cursor": first.headers[NEXT_CURSOR_HEADER]},
+        headers=headers
+    )
+    assert response.status_code == 400
+
+
+def test_lists_are_paged_by_id(client, headers):
+    pages = fetch_pages(client, "/lists", headers, limit=2)
+
+    assert [len(page) for page in pages] == [2, 2, 1]
+    assert [shopping_list["id"] for page in pages for shopping_list in page] == list(range(LIST_ID, LIST_ID + 5))
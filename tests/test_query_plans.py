@@ -0,0 +1,29 @@
+"""The hot queries must use an index on a freshly migrated database."""
+import pytest
+from sqlalchemy import create_engine
+
+from API.migrations import run_migrations
+from API.migrations.query_plans import find_full_scans
+
+
+@pytest.fixture
+def engine(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'plans.db'}")
+    run_migrations(engine)
+    yield engine
+    engine.dispose()
+
+
+def test_no_full_scans_after_migrations(engine):
+    with engine.connect() as connection:
+        assert find_full_scans(connection) == []
+
+
+def test_missing_index_is_reported(engine):
+    with engine.begin() as connection:
+        connection.exec_driver_sql('DROP INDEX "ix_ShoppingLists_groupId"')
+
+    with engine.connect() as connection:
+        full_scans = find_full_scans(connection)
+
+    assert ("lists of groups", "ShoppingLists") in [(scan.query, scan.table) for scan in full_scans]
@@ -0,0 +1,112 @@
+"""Delta snapshots across pruning of the change log, and snapshot ETags."""
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import update
+
+from API.auth.jwt_handler import create_access_token
+from API.database import SessionLocal
+from API.main import prune_change_log
+from API.models import User, Group, UserGroup, ShoppingList, ShoppingItem, Change
+from API.services.changes import record_change, GROUP, SHOPPING_ITEM
+
+QUIET_USER_ID = 21
+BUSY_USER_ID = 22
+QUIET_GROUP_ID = 2100
+BUSY_GROUP_ID = 2200
+
+
+@pytest.fixture(scope="module", autouse=True)
+def groups(client):
+    """A quiet and a busy user, each alone in a group with one list of many items."""
+    db = SessionLocal()
+    for user_id, group_id, name in [(QUIET_USER_ID, QUIET_GROUP_ID, "quinn"), (BUSY_USER_ID, BUSY_GROUP_ID, "bea")]:
+        db.add(User(id=user_id, username=name, displayName=name.title(), passwordHash="-"))
+        db.add(Group(id=group_id, name=f"Group {group_id}", inviteCode=f"DELTA{group_id}"))
+        db.add(UserGroup(userId=user_id, groupId=group_id))
+        db.add(ShoppingList(id=group_id, groupId=group_id, name="Weekly"))
+        for index in range(40):
+            db.add(ShoppingItem(id=group_id * 100 + index, shoppingListId=group_id,
+                                name=f"Item number {index} with a longer name", checked=False))
+        record_change(db, group_id, GROUP, group_id)
+    db.commit()
+    db.close()
+
+
+def auth(user_id: int) -> dict:
+    return {"Authorization": f"Bearer {create_access_token(user_id)}"}
+
+
+def touch_item(group_id: int):
+    db = SessionLocal()
+    record_change(db, group_id, SHOPPING_ITEM, group_id * 100)
+    db.commit()
+    db.close()
+
+
+def prune_all_but_busy_group():
+    """Age every change past the retention, then let the busy group change again and prune."""
+    db = SessionLocal()
+    db.execute(update(Change).values(createdAt=datetime.utcnow() - timedelta(days=365)))
+    db.commit()
+    db.close()
+    touch_item(BUSY_GROUP_ID)
+    prune_change_log()
+
+
+def test_cursor_older_than_change_log_gets_full_snapshot(client):
+    cursor = client.get("/snapshot", headers=auth(QUIET_USER_ID)).json()["cursor"]
+    touch_item(BUSY_GROUP_ID)
+
+    prune_all_but_busy_group()
+
+    response = client.get("/snapshot", params={"since": cursor}, headers=auth(QUIET_USER_ID))
+    assert response.status_code == 200
+    assert response.json()["deleted"] is None
+    assert len(response.json()["shoppingItems"]) == 40
+
+
+def test_delta_after_pruning_stays_a_delta(client):
+    prune_all_but_busy_group()
+
+    # The quiet user's changes are all pruned, the cursor must still be valid
+    cursor = client.get("/snapshot", headers=auth(QUIET_USER_ID)).json()["cursor"]
+    response = client.get("/snapshot", params={"since": cursor}, headers=auth(QUIET_USER_ID))
+
+    assert response.status_code == 200
+    assert response.json()["deleted"] is not None
+    assert response.json()["shoppingItems"] == []
+
+    touch_item(QUIET_GROUP_ID)
+    response = client.get("/snapshot", params={"since": cursor}, headers=auth(QUIET_USER_ID))
+    assert [item["id"] for item in response.json()["shoppingItems"]] == [QUIET_GROUP_ID * 100]
+
+
+def test_unchanged_snapshot_answers_not_modified(client):
+    first = client.get("/snapshot", headers=auth(BUSY_USER_ID))
+    etag = first.headers["ETag"]
+
+    response = client.get("/snapshot", headers={**auth(BUSY_USER_ID), "If-None-Match": etag})
+    assert response.status_code == 304
+    assert response.headers["ETag"] == etag
+
+    touch_item(BUSY_GROUP_ID)
+    response = client.get("/snapshot", headers={**auth(BUSY_USER_ID), "If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.headers["ETag"] != etag
+
+
+def test_compressed_snapshot_has_its_own_etag(client):
+    plain = client.get("/snapshot", headers={**auth(BUSY_USER_ID), "Accept-Encoding": "identity"})
+    compressed = client.get("/snapshot", headers={**auth(BUSY_USER_ID), "Accept-Encoding": "gzip"})
+
+    assert compressed.headers["Content-Encoding"] == "gzip"
+    assert compressed.json() == plain.json()
+    assert compressed.headers["ETag"] != plain.headers["ETag"]
+
+    response = client.get(
+        "/snapshot",
+        headers={**auth(BUSY_USER_ID), "Accept-Encoding": "gzip", "If-None-Match": compressed.headers["ETag"]}
+    )
+    assert response.status_code == 304
+    assert response.headers["ETag"] == compressed.headers["ETag"]
@@ -0,0 +1,86 @@
+"""The number of statements of GET /snapshot must not grow with the number of groups."""
+import pytest
+
+from API.auth.jwt_handler import create_access_token
+from API.database import SessionLocal
+from API.models import User, Group, UserGroup, ShoppingList, ShoppingItem
+from API.services.changes import record_change, GROUP, SHOPPING_ITEM
+from API.services.snapshot_cache import fragment_cache
+from API.sql_profiler import assert_query_budget, count_queries
+
+USER_ID = 1
+OTHER_USER_ID = 2
+
+
+@pytest.fixture(scope="module", autouse=True)
+def users(client):
+    db = SessionLocal()
+    db.add_all([
+        User(id=USER_ID, username="alice", displayName="Alice", passwordHash="-"),
+        User(id=OTHER_USER_ID, username="bob", displayName="Bob", passwordHash="-"),
+    ])
+    db.commit()
+    db.close()
+
+
+@pytest.fixture
+def headers():
+    return {"Authorization": f"Bearer {create_access_token(USER_ID)}"}
+
+
+def add_groups(count: int, first_id: int):
+    """Add groups shared with another user, each with two lists of three items."""
+    db = SessionLocal()
+    for group_id in range(first_id, first_id + count):
+        db.add(Group(id=group_id, name=f"Group {group_id}", inviteCode=f"CODE{group_id}"))
+        db.add_all([UserGroup(userId=USER_ID, groupId=group_id), UserGroup(userId=OTHER_USER_ID, groupId=group_id)])
+        for list_number in range(2):
+            list_id = group_id * 10 + list_number
+            db.add(ShoppingList(id=list_id, groupId=group_id, name=f"List {list_id}"))
+            for item_number in range(3):
+                db.add(ShoppingItem(id=list_id * 10 + item_number, shoppingListId=list_id,
+                                    name=f"Item {item_number}", checked=False))
+        record_change(db, group_id, GROUP, group_id)
+    db.commit()
+    db.close()
+
+
+def touch_items(group_ids):
+    """Record a change of one item in each group."""
+    db = SessionLocal()
+    for group_id in group_ids:
+        record_change(db, group_id, SHOPPING_ITEM, group_id * 100)
+    db.commit()
+    db.close()
+
+
+def test_full_snapshot_query_count_does_not_grow_with_groups(client, headers):
+    add_groups(1, first_id=100)
+    fragment_cache.clear()
+    with count_queries() as one_group:
+        response = client.get("/snapshot", headers=headers)
+    assert response.status_code == 200
+    assert len(response.json()["groups"]) == 1
+
+    add_groups(10, first_id=200)
+    fragment_cache.clear()
+    with assert_query_budget(one_group.count, max_repeats=1):
+        response = client.get("/snapshot", headers=headers)
+    assert response.status_code == 200
+    assert len(response.json()["groups"]) == 11
+
+
+def test_delta_snapshot_query_count_does_not_grow_with_groups(client, headers):
+    cursor = client.get("/snapshot", headers=headers).json()["cursor"]
+
+    touch_items([100])
+    with count_queries() as one_group:
+        response = client.get("/snapshot", params={"since": cursor}, headers=headers)
+    assert response.status_code == 200
+    assert len(response.json()["shoppingItems"]) == 1
+
+    touch_items(range(200, 210))
+    with assert_query_budget(one_group.count, max_repeats=1):
+        response = client.get("/snapshot", params={"since": cursor}, headers=headers)
+    assert response.status_code == 200
+    assert len(response.json()["shoppingItems"]) == 11
@@ -0,0 +1,59 @@
+"""Ranking and deduplication of the user search."""
+import pytest
+
+from API.database import SessionLocal
+from API.models import User
+from API.services.user_search import index_user, find_users, OVERFETCH
+
+SEARCHING_USER_ID = 31
+
+# (id, username, display name)
+USERS = [
+    (SEARCHING_USER_ID, "zed", "Zed"),
+    (32, "ozzie", "Ozzie"),
+    (33, "zeddy", "Zeddy"),
+    (34, "carl", "Carl Zed"),
+    (35, "zedd", "Zedd"),
+    (36, "many", "Many" + " Zedo" * 12),
+    (37, "dora", "Dora Zedora"),
+    (38, "mazed", "Mazed"),
+]
+
+
+@pytest.fixture(scope="module")
+def db(client):
+    db = SessionLocal()
+    for user_id, username, display_name in USERS:
+        user = User(id=user_id, username=username, displayName=display_name, passwordHash="-")
+        db.add(user)
+        db.flush()
+        index_user(db, user)
+    db.commit()
+    yield db
+    db.close()
+
+
+def usernames(users) -> list:
+    return [user.username for user in users]
+
+
+def test_results_are_ranked_exact_prefix_word_substring(db):
+    assert usernames(find_users(db, "zed", exclude_user_id=32)) == [
+        "zed", "zedd", "zeddy", "carl", "many", "dora", "mazed"
+    ]
+
+
+def test_searching_user_is_excluded(db):
+    assert "zed" not in usernames(find_users(db, "Zed", exclude_user_id=SEARCHING_USER_ID))
+
+
+def test_user_matching_with_many_terms_takes_one_place(db):
+    # More matching terms of one user than a first batch reads
+    assert 12 > 2 * OVERFETCH
+    assert usernames(find_users(db, "zedo", exclude_user_id=SEARCHING_USER_ID, limit=2)) == ["many", "dora"]
+
+
+def test_queries_longer_than_a_term_are_checked_against_the_names(db):
+    assert usernames(find_users(db, "zedo zedo zedo zedo zedo zedo zedo", exclude_user_id=SEARCHING_USER_ID)) == ["many"]
+    assert find_users(db, "zedo zedo zedo zedo zedo zedo zedo zedo zedo zedo zedo zedo zedo",
+                      exclude_user_id=SEARCHING_USER_ID) == []